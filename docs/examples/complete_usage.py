@@ -7,6 +7,7 @@ It covers initialization, memory operations, searching, filtering, and advanced
 
 from mem4ai import Memtor, Memory
 from mem4ai.strategies import CustomEmbeddingStrategy, CustomStorageStrategy, CustomSearchStrategy
+from mem4ai.utils.vector_ops import top_k_indices
 import numpy as np
 
 def main():
@@ -154,12 +155,9 @@ def main():
         def search(self, query, memories, top_k, keywords, metadata_filters):
             # Simple search: rank by number of common words
             query_words = set(query.lower().split())
-            scored_memories = [
-                (memory, len(set(memory.content.lower().split()) & query_words))
-                for memory in memories
-            ]
-            sorted_memories = sorted(scored_memories, key=lambda x: x[1], reverse=True)
-            return [memory for memory, score in sorted_memories[:top_k]]
+            scores = [len(set(memory.content.lower().split()) & query_words) for memory in memories]
+            # top_k_indices selects with argpartition instead of sorting every memory
+            return [memories[i] for i in top_k_indices(scores, top_k)]
 
     # Initialize Memtor with custom strategies
     custom_memtor = Memtor(
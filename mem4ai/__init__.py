@@ -9,7 +9,7 @@ from .memtor import Memtor
 from .core.memory import Memory
 from .strategies.embedding_strategy import EmbeddingStrategy
 from .strategies.storage_strategy import StorageStrategy
-from .strategies.search_strategy import SearchStrategy
+from .strategies.search_strategy import SearchStrategy, NumbaAcceleratedSearchStrategy
 from .strategies.knowledge_extraction import LLMExtractionStrategy, SummaryExtractionStrategy, EchoKnowledgeStrategy, SummaryExtractionStrategy
 from .strategies.knowledge_extraction import KnowledgeExtractionStrategy
 from .utils.config_manager import config_manager
@@ -18,7 +18,7 @@ from .utils.config_manager import config_manager
 __version__ = "0.1.1"
 
 # Define what should be importable from the package
-__all__ = ['Memtor', 'Memory', 'EmbeddingStrategy', 'StorageStrategy', 'SearchStrategy', 'config_manager', 'LLMExtractionStrategy', 'SummaryExtractionStrategy', 'EchoKnowledgeStrategy', 'KnowledgeExtractionStrategy']
+__all__ = ['Memtor', 'Memory', 'EmbeddingStrategy', 'StorageStrategy', 'SearchStrategy', 'NumbaAcceleratedSearchStrategy', 'config_manager', 'LLMExtractionStrategy', 'SummaryExtractionStrategy', 'EchoKnowledgeStrategy', 'KnowledgeExtractionStrategy']
 
 # Package level initialization code (if any)
 def initialize():
@@ -0,0 +1,109 @@
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import re
+import threading
+import numpy as np
+
+# Same tokens as the TfidfVectorizer used for per-query BM25: lower-cased, 2+ word characters, no stop words
+_TOKEN = re.compile(r"(?u)\b\w\w+\b")
+
+@lru_cache(maxsize=None)
+def _stop_words() -> frozenset:
+    # Imported on first use: loading scikit-learn is most of the time `import mem4ai` takes
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    return ENGLISH_STOP_WORDS
+
+def tokenize(text: str) -> List[str]:
+    stop_words = _stop_words()
+    return [token for token in _TOKEN.findall(text.lower()) if token not in stop_words]
+
+class BM25Index:
+    """
+    Inverted index of memory contents for BM25 scoring over the whole corpus.
+
+    Term frequencies, document frequencies and lengths are updated as memories are
+    added, changed and removed, so scoring a query only looks up the postings of its
+    terms for the candidate memories instead of re-tokenizing them on every search.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.clear()
+
+    def add(self, memory_id: str, content: str) -> None:
+        """Index a memory's content, replacing what was indexed for it before."""
+        counts = Counter(tokenize(content))
+        with self._lock:
+            self._remove(memory_id)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[memory_id] = tf
+            self.doc_lens[memory_id] = sum(counts.values())
+            self._terms[memory_id] = tuple(counts)
+            self._total_len += self.doc_lens[memory_id]
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        for memory_id, content in items:
+            self.add(memory_id, content)
+
+    def remove(self, memory_id: str) -> bool:
+        with self._lock:
+            return self._remove(memory_id)
+
+    def remove_many(self, memory_ids: Iterable[str]) -> int:
+        with self._lock:
+            return sum(1 for memory_id in memory_ids if self._remove(memory_id))
+
+    def _remove(self, memory_id: str) -> bool:
+        terms = self._terms.pop(memory_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self.postings[term]
+            del postings[memory_id]
+            if not postings:
+                del self.postings[term]
+        self._total_len -= self.doc_lens.pop(memory_id)
+        return True
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_lens) - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str, memory_ids: List[str], keywords: Optional[List[str]] = None) -> np.ndarray:
+        """
+        BM25 scores of the given memories for query, one per ID in order. Keywords count
+        as extra query terms. Memories missing from the index score 0.
+        """
+        scores = np.zeros(len(memory_ids))
+        terms = tokenize(query)
+        for keyword in keywords or []:
+            terms.extend(tokenize(keyword))
+        with self._lock:
+            if not self.doc_lens or not terms:
+                return scores
+            avg_len = self._total_len / len(self.doc_lens) or 1.0
+            for term, query_tf in Counter(terms).items():
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = self.idf(term)
+                for i, memory_id in enumerate(memory_ids):
+                    tf = postings.get(memory_id)
+                    if tf:
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_lens[memory_id] / avg_len)
+                        scores[i] += query_tf * idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def clear(self) -> None:
+        with self._lock:
+            self.postings: Dict[str, Dict[str, int]] = {}
+            self.doc_lens: Dict[str, int] = {}
+            self._terms: Dict[str, Tuple[str, ...]] = {}
+            self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lens)
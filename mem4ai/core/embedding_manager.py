@@ -1,14 +1,256 @@
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+import hashlib
+import os
+import re
+import sqlite3
+import threading
 from ..strategies.embedding_strategy import get_embedding_strategy, EmbeddingStrategy
 from ..utils.config_manager import config_manager
 import numpy as np
 
+def l2_normalize(embedding) -> np.ndarray:
+    """Return the embedding as float32 with each row scaled to unit length."""
+    embedding = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(embedding, axis=-1, keepdims=True)
+    return embedding / np.maximum(norms, 1e-12)
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the lower-cased word tokens; near-identical texts differ in few bits."""
+    tokens = re.findall(r'\w+', text.lower())
+    if not tokens:
+        return 0
+    hashes = np.array([int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+                       for token in tokens], dtype=np.uint64)
+    shifts = np.arange(64, dtype=np.uint64)
+    votes = ((hashes[:, None] >> shifts) & np.uint64(1)).sum(axis=0, dtype=np.int64) * 2 - len(tokens)
+    return int(((votes > 0).astype(np.uint64) << shifts).sum(dtype=np.uint64))
+
 class EmbeddingManager:
+    FUZZY_BANDS = 4  # 16-bit bands: signatures within 3 bits always share at least one band
+
     def __init__(self, embedding_strategy: EmbeddingStrategy = None):
         self.embedding_strategy = embedding_strategy or get_embedding_strategy()
+        self.cache_size: int = config_manager.get('embedding.cache_size', 1024)
+        # LRU of text digest -> embedding, so repeated queries/contents skip the encoder
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # Digests include the model and dimension so a config change never serves stale vectors
+        self._key_prefix = (f"{getattr(self.embedding_strategy, 'model', type(self.embedding_strategy).__name__)}|"
+                            f"{self.embedding_strategy.dimension}|")
+        # Search queries get their own LRU so bulk ingestion cannot evict hot queries
+        self.query_cache_size: int = config_manager.get('embedding.query_cache_size', 1024)
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        # Guards the LRUs, fuzzy tables and counters: embed runs on executor threads, the
+        # background worker and add_memory_async at once. Encoder calls happen outside it
+        self._lock = threading.Lock()
+
+        # Optional second tier reusing the embedding of a near-duplicate cached text
+        self.fuzzy_cache: bool = config_manager.get('embedding.fuzzy_cache', False)
+        self.fuzzy_max_distance: int = config_manager.get('embedding.fuzzy_max_distance', 3)
+        self.fuzzy_min_similarity: float = config_manager.get('embedding.fuzzy_min_similarity', 0.95)
+        self._fuzzy: Dict[bytes, tuple] = {}  # digest -> (simhash, normalized text)
+        self._bands: List[Dict[int, set]] = [{} for _ in range(self.FUZZY_BANDS)]
+
+        # Optional SQLite cache that keeps embeddings across processes
+        self.cache_path: Optional[str] = config_manager.get('embedding.cache_path', None)
+        self._db = None
+        self._db_lock = threading.Lock()
+        if self.cache_path:
+            directory = os.path.dirname(os.path.abspath(self.cache_path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB)")
+            self._db.commit()
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256((self._key_prefix + text).encode()).digest()
+
+    def _cached(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+            return embedding
+
+    def _remember(self, key: bytes, embedding: np.ndarray, text: Optional[str] = None) -> np.ndarray:
+        """Cache embedding under key and return the cached array."""
+        if self.cache_size <= 0:
+            return embedding
+        # Cached arrays are shared between callers, so the cache keeps its own read-only copy
+        # rather than freezing the caller's array
+        embedding = np.array(embedding)
+        embedding.flags.writeable = False
+        signature = simhash(text) if self.fuzzy_cache and text is not None else None
+        with self._lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            if signature is not None and key not in self._fuzzy:
+                self._fuzzy[key] = (signature, ' '.join(text.lower().split()))
+                for band, table in enumerate(self._bands):
+                    table.setdefault((signature >> (16 * band)) & 0xFFFF, set()).add(key)
+            while len(self._cache) > self.cache_size:
+                evicted, _ = self._cache.popitem(last=False)
+                self._forget_fuzzy(evicted)
+        return embedding
+
+    def _forget_fuzzy(self, key: bytes) -> None:
+        entry = self._fuzzy.pop(key, None)
+        if entry is None:
+            return
+        for band, table in enumerate(self._bands):
+            bucket = table.get((entry[0] >> (16 * band)) & 0xFFFF)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[(entry[0] >> (16 * band)) & 0xFFFF]
+
+    def _fuzzy_lookup(self, text: str) -> Optional[np.ndarray]:
+        """Embedding of a cached text whose SimHash and characters are nearly identical to text."""
+        if not self._fuzzy:
+            return None
+        signature = simhash(text)
+        normalized = ' '.join(text.lower().split())
+        with self._lock:
+            candidates = set()
+            for band, table in enumerate(self._bands):
+                candidates |= table.get((signature >> (16 * band)) & 0xFFFF, set())
+            for key in candidates:
+                cached_signature, cached_text = self._fuzzy[key]
+                if bin(signature ^ cached_signature).count('1') > self.fuzzy_max_distance:
+                    continue
+                if SequenceMatcher(None, normalized, cached_text).ratio() >= self.fuzzy_min_similarity:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+        return None
+
+    def _load_persisted(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        with self._db_lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+                for key, vec in rows:
+                    found[key] = np.frombuffer(vec, dtype=np.float32).reshape(1, -1)
+        return found
+
+    def _persist(self, items: List[tuple]) -> None:
+        if self._db is None or not items:
+            return
+        with self._db_lock:
+            self._db.executemany("INSERT OR IGNORE INTO embeddings (hash, vec) VALUES (?, ?)",
+                                 [(key, np.asarray(embedding, dtype=np.float32).tobytes())
+                                  for key, embedding in items])
+            self._db.commit()
+
+    def embed(self, text, fuzzy: Optional[bool] = None) -> np.ndarray:
+        """
+        Embed text through the caches.
+
+        :param fuzzy: Whether a near-duplicate cached text may answer; defaults to embedding.fuzzy_cache.
+                      Pass False where exact embeddings matter.
+        """
+        if not isinstance(text, str) or (self.cache_size <= 0 and self._db is None):
+            return self.embedding_strategy.embed(text)
+
+        key = self._key(text)
+        embedding = self._cached(key)
+        if embedding is None:
+            embedding = self._load_persisted([key]).get(key)
+            if embedding is not None:
+                embedding = self._remember(key, embedding, text)
+        if embedding is None and (self.fuzzy_cache if fuzzy is None else fuzzy):
+            embedding = self._fuzzy_lookup(text)
+        if embedding is not None:
+            with self._lock:
+                self._hits += 1
+            return embedding
+
+        with self._lock:
+            self._misses += 1
+        embedding = self.embedding_strategy.embed(text)
+        self._persist([(key, embedding)])
+        if isinstance(embedding, np.ndarray):
+            embedding = self._remember(key, embedding, text)
+        return embedding
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a search query, keeping repeated queries (pagination, autocomplete) in a
+        dedicated LRU in front of the shared caches.
+        """
+        with self._lock:
+            embedding = self._query_cache.get(query)
+            if embedding is not None:
+                self._query_cache.move_to_end(query)
+                self._hits += 1
+                return embedding
+
+        embedding = self.embed(query)
+        if self.query_cache_size > 0 and isinstance(embedding, np.ndarray):
+            if embedding.flags.writeable:
+                # Only arrays the shared cache already froze are kept as they are
+                embedding = np.array(embedding)
+                embedding.flags.writeable = False
+            with self._lock:
+                self._query_cache[query] = embedding
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+
+    def embed_batch(self, texts: List[str], fuzzy: Optional[bool] = None) -> np.ndarray:
+        """
+        Embed several texts, sending only the ones missing from the caches to the strategy
+        in a single batch. Returns one row per text.
+        """
+        keys = [self._key(text) for text in texts]
+        rows = [self._cached(key) if self.cache_size > 0 else None for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+
+        persisted = self._load_persisted([keys[i] for i in missing])
+        for i in missing:
+            if keys[i] in persisted:
+                rows[i] = persisted[keys[i]]
+                self._remember(keys[i], rows[i], texts[i])
+            elif self.fuzzy_cache if fuzzy is None else fuzzy:
+                rows[i] = self._fuzzy_lookup(texts[i])
+        missing = [i for i in missing if rows[i] is None]
+        with self._lock:
+            self._hits += len(texts) - len(missing)
+            self._misses += len(missing)
+
+        if missing:
+            embeddings = np.asarray(self.embedding_strategy.embed_batch([texts[i] for i in missing]))
+            for i, embedding in zip(missing, embeddings):
+                rows[i] = embedding.reshape(1, -1)
+                self._remember(keys[i], rows[i], texts[i])
+            self._persist([(keys[i], rows[i]) for i in missing])
+
+        return np.vstack(rows)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Cache hits and misses (in-memory or on-disk) since the manager was created."""
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'size': len(self._cache)}
 
-    def embed(self, text) -> np.ndarray:
-        return self.embedding_strategy.embed(text)
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._query_cache.clear()
+            self._fuzzy.clear()
+            self._bands = [{} for _ in range(self.FUZZY_BANDS)]
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
 
     @property
     def dimension(self) -> int:
-        return self.embedding_strategy.dimension
\ No newline at end of file
+        return self.embedding_strategy.dimension
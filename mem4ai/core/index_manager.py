@@ -0,0 +1,505 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from ..utils.config_manager import config_manager
+from ..utils.filters import ARRAY_OPERATORS
+from ..utils.vector_ops import top_k_indices
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+class IndexManager(ABC):
+    METADATA_KEYS = ('user_id', 'session_id', 'agent_id')
+    # Whether search() applies its filters argument
+    filters_metadata = False
+    # Whether search() scores are approximate, so callers should fetch extra candidates to rerank
+    approximate = False
+    # Metadata keys whose (key, op, value) conditions search() applies
+    filter_keys: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def add(self, memory_id: str, embedding, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Add or replace the embedding (and indexed metadata) stored for a memory."""
+        pass
+
+    def add_many(self, memory_ids: List[str], embeddings,
+                 metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        metadatas = metadatas or [None] * len(memory_ids)
+        for memory_id, embedding, metadata in zip(memory_ids, embeddings, metadatas):
+            self.add(memory_id, embedding, metadata)
+
+    @abstractmethod
+    def remove(self, memory_id: str) -> bool:
+        pass
+
+    def remove_many(self, memory_ids: List[str]) -> int:
+        return sum(1 for memory_id in memory_ids if self.remove(memory_id))
+
+    @abstractmethod
+    def search(self, query_embedding, k: int, filters: Optional[Dict[str, Any]] = None,
+               conditions: Optional[List[Tuple[str, str, Any]]] = None) -> List[Tuple[str, float]]:
+        """
+        Return up to k (memory_id, score) pairs, best match first.
+
+        filters maps METADATA_KEYS to required values. Indices that cannot filter
+        ignore it, so callers must still check the metadata of the hits.
+        conditions are (key, op, value) metadata filters on filter_keys, applied by
+        indices that keep those keys; others ignore them like filters.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def filter_ids(self, filters: Dict[str, Any],
+                   conditions: Optional[List[Tuple[str, str, Any]]] = None) -> Optional[List[str]]:
+        """
+        Return the IDs of memories whose METADATA_KEYS values equal all the given filters,
+        or None if this index does not track metadata.
+
+        conditions are (key, op, value) filters on filter_keys, as in search().
+        """
+        return None
+
+class NumpyIndexManager(IndexManager):
+    """
+    Brute-force cosine index keeping all embeddings in one contiguous matrix.
+
+    Rows are L2-normalized on insert, so scoring is a single matrix-vector product.
+    Capacity doubles on overflow and deletes move the last row into the freed slot.
+    METADATA_KEYS values, and those of any extra filter_keys, are kept in row-aligned
+    columns; METADATA_KEYS values are also kept in value -> rows postings.
+    (key, op, value) conditions on filter_keys are evaluated as element-wise masks over the columns.
+    Selective ID filters gather just the posted rows before scoring; broad ones are
+    applied as a mask while scoring. Scoring walks the matrix in tiles of tile_rows rows, merging per-tile top-k results;
+    with dtype='float16' each tile is upcast to float32 just before its product.
+    dtype='int8' stores each row scaled by max(|v|)/127 with its float32 scale kept
+    alongside; scores are then approximate and meant to be reranked by the caller.
+    """
+    DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}
+    filters_metadata = True
+
+    def __init__(self, initial_capacity: int = 1024, dtype: str = 'float32', tile_rows: int = 1024,
+                 filter_keys: Sequence[str] = ()):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        self.filter_keys = tuple(self.METADATA_KEYS) + tuple(key for key in filter_keys
+                                                             if key not in self.METADATA_KEYS)
+        self.initial_capacity = initial_capacity
+        self.dtype = self.DTYPES[dtype]
+        self.approximate = dtype == 'int8'
+        self.tile_rows = tile_rows
+        self.clear()
+
+    def _prepare(self, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _set_row(self, row: int, vector: np.ndarray, metadata: Dict[str, Any]) -> None:
+        if self._scales is not None:
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            self._scales[row] = scale
+            vector = np.round(vector / scale)
+        self._matrix[row] = vector
+        for key, column in self._columns.items():
+            column[row] = metadata.get(key)
+
+    def _post_row(self, row: int) -> None:
+        for key in self.METADATA_KEYS:
+            column = self._columns[key]
+            if column[row] is not None:
+                self._postings[key].setdefault(column[row], set()).add(row)
+
+    def _unpost_row(self, row: int) -> None:
+        for key in self.METADATA_KEYS:
+            value = self._columns[key][row]
+            if value is not None:
+                rows = self._postings[key][value]
+                rows.discard(row)
+                if not rows:
+                    del self._postings[key][value]
+
+    def add(self, memory_id: str, embedding, metadata: Optional[Dict[str, Any]] = None) -> None:
+        vector = self._prepare(embedding)
+        metadata = metadata or {}
+        row = self._rows.get(memory_id)
+        if row is not None:
+            self._unpost_row(row)
+            self._set_row(row, vector, metadata)
+            self._post_row(row)
+            return
+
+        if self._matrix is None:
+            self._matrix = np.empty((self.initial_capacity, vector.shape[0]), dtype=self.dtype)
+            self._columns = {key: np.empty(self.initial_capacity, dtype=object) for key in self.filter_keys}
+            if self.approximate:
+                self._scales = np.ones(self.initial_capacity, dtype=np.float32)
+        elif self._size == self._matrix.shape[0]:
+            grown = np.empty((self._size * 2, self._matrix.shape[1]), dtype=self.dtype)
+            grown[:self._size] = self._matrix
+            self._matrix = grown
+            if self._scales is not None:
+                grown_scales = np.ones(self._size * 2, dtype=np.float32)
+                grown_scales[:self._size] = self._scales
+                self._scales = grown_scales
+            for key, column in self._columns.items():
+                grown_column = np.empty(self._size * 2, dtype=object)
+                grown_column[:self._size] = column
+                self._columns[key] = grown_column
+
+        self._set_row(self._size, vector, metadata)
+        self._post_row(self._size)
+        self._rows[memory_id] = self._size
+        self._memory_ids.append(memory_id)
+        self._size += 1
+
+    def remove(self, memory_id: str) -> bool:
+        row = self._rows.pop(memory_id, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        self._unpost_row(row)
+        if row != last:
+            moved_id = self._memory_ids[last]
+            self._unpost_row(last)
+            self._matrix[row] = self._matrix[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            for column in self._columns.values():
+                column[row] = column[last]
+            self._post_row(row)
+            self._memory_ids[row] = moved_id
+            self._rows[moved_id] = row
+        for column in self._columns.values():
+            column[last] = None
+        self._memory_ids.pop()
+        self._size = last
+        return True
+
+    def _mask(self, filters: Dict[str, Any], start: int, end: int) -> np.ndarray:
+        mask = np.ones(end - start, dtype=bool)
+        for key, value in filters.items():
+            if key in self._columns:
+                mask &= self._columns[key][start:end] == value
+        return mask
+
+    def _condition_mask(self, conditions: List[Tuple[str, str, Any]], rows) -> np.ndarray:
+        """Which of the selected rows (a slice or an index array) satisfy every condition."""
+        mask = None
+        for key, op, value in conditions:
+            column = self._columns[key][rows]
+            # A missing key fails every condition, as in compile_filters
+            present = column != None  # noqa: E711 - element-wise over the object column
+            passed = np.zeros(len(column), dtype=bool)
+            passed[present] = ARRAY_OPERATORS[op](column[present], value).astype(bool)
+            mask = passed if mask is None else mask & passed
+        return mask
+
+    def _candidate_rows(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Sorted rows matching every indexed filter, or None if no filter is indexed."""
+        postings = [self._postings[key].get(value, set()) for key, value in filters.items()
+                    if key in self._postings]
+        if not postings:
+            return None
+        postings.sort(key=len)
+        rows: Set[int] = postings[0].intersection(*postings[1:])
+        return np.sort(np.fromiter(rows, dtype=np.intp, count=len(rows)))
+
+    def filter_ids(self, filters: Dict[str, Any],
+                   conditions: Optional[List[Tuple[str, str, Any]]] = None) -> Optional[List[str]]:
+        if any(key not in self.METADATA_KEYS for key in filters):
+            return None
+        if self._size == 0:
+            return []
+        rows = self._candidate_rows(filters)
+        if conditions:
+            # Evaluated as masks over the row-aligned columns rather than per memory
+            rows = np.arange(self._size) if rows is None else rows
+            rows = rows[self._condition_mask(conditions, rows)]
+        if rows is None:
+            return list(self._memory_ids)
+        return [self._memory_ids[row] for row in rows]
+
+    def _score(self, rows, query: np.ndarray) -> np.ndarray:
+        """Scores of the selected rows (a slice or an index array), upcast to float32."""
+        scores = self._matrix[rows].astype(np.float32, copy=False) @ query
+        if self._scales is not None:
+            scores *= self._scales[rows]
+        return scores
+
+    def _search_rows(self, query: np.ndarray, k: int, rows: np.ndarray) -> List[Tuple[str, float]]:
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), self.tile_rows):
+            tile = rows[start:start + self.tile_rows]
+            scores[start:start + len(tile)] = self._score(tile, query)
+        return [(self._memory_ids[rows[i]], float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def search(self, query_embedding, k: int, filters: Optional[Dict[str, Any]] = None,
+               conditions: Optional[List[Tuple[str, str, Any]]] = None) -> List[Tuple[str, float]]:
+        if self._size == 0:
+            return []
+        query = self._prepare(query_embedding)
+        k = min(k, self._size)
+
+        # Metadata is resolved before any scoring: postings narrow the rows, then conditions
+        # are evaluated over the columns of what is left
+        rows = self._candidate_rows(filters) if filters else None
+        if conditions:
+            rows = np.arange(self._size) if rows is None else rows
+            rows = rows[self._condition_mask(conditions, rows)]
+        # Gathering rows only pays off when the filters discard most of the matrix
+        if rows is not None and len(rows) <= self._size // 2:
+            return self._search_rows(query, k, rows)
+        keep = None
+        if rows is not None:
+            keep = np.zeros(self._size, dtype=bool)
+            keep[rows] = True
+
+        # Filter, score and select in one pass: each cache-sized tile is scored, rows
+        # failing the filters are masked to -inf and only the tile's top k are kept,
+        # so no N-sized score temporaries are created
+        tile_rows, tile_scores = [], []
+        for start in range(0, self._size, self.tile_rows):
+            end = min(start + self.tile_rows, self._size)
+            scores = self._score(slice(start, end), query)
+            if keep is not None:
+                scores[~keep[start:end]] = -np.inf
+            elif filters:
+                scores[~self._mask(filters, start, end)] = -np.inf
+            top = top_k_indices(scores, k)
+            tile_rows.append(top + start)
+            tile_scores.append(scores[top])
+
+        rows, scores = np.concatenate(tile_rows), np.concatenate(tile_scores)
+        top = top_k_indices(scores, k)
+        return [(self._memory_ids[rows[i]], float(scores[i])) for i in top if scores[i] > -np.inf]
+
+    def clear(self) -> None:
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None  # Per-row dequantization scales for int8
+        self._columns: Dict[str, np.ndarray] = {}
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {key: {} for key in self.METADATA_KEYS}
+        self._rows: Dict[str, int] = {}
+        self._memory_ids: List[str] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+class FaissIndexManager(IndexManager):
+    """
+    In-memory FAISS inner-product index over memory embeddings.
+
+    Vectors are L2-normalized before insertion, so inner product equals cosine
+    similarity. FAISS only accepts int64 ids, so memory IDs are mapped to a local counter.
+    With dtype='float16' or 'int8' vectors are stored through a fp16 or 8-bit scalar quantizer.
+    """
+
+    def __init__(self, dimension: Optional[int] = None, dtype: str = 'float32'):
+        if faiss is None:
+            raise ImportError("FAISS is not installed. Install it with `pip install mem4ai[faiss]`")
+        if dtype not in ('float32', 'float16', 'int8'):
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        self.dimension = dimension
+        self.dtype = dtype
+        self.approximate = dtype == 'int8'
+        self.index = None
+        self._memory_ids: Dict[int, str] = {}
+        self._int_ids: Dict[str, int] = {}
+        self._next_id = 0
+
+    def _prepare(self, embedding) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _ensure_index(self, dimension: int) -> None:
+        if self.index is None:
+            self.dimension = self.dimension or dimension
+            if self.dtype in ('float16', 'int8'):
+                quantizer = faiss.ScalarQuantizer.QT_fp16 if self.dtype == 'float16' else faiss.ScalarQuantizer.QT_8bit
+                base = faiss.IndexScalarQuantizer(self.dimension, quantizer, faiss.METRIC_INNER_PRODUCT)
+                # The 8-bit quantizer needs per-dimension ranges; unit vectors lie in [-1, 1]
+                if self.dtype == 'int8':
+                    base.train(np.vstack([np.full((1, self.dimension), -1.0, dtype=np.float32),
+                                          np.full((1, self.dimension), 1.0, dtype=np.float32)]))
+            else:
+                base = faiss.IndexFlatIP(self.dimension)
+            self.index = faiss.IndexIDMap2(base)
+
+    def add(self, memory_id: str, embedding, metadata: Optional[Dict[str, Any]] = None) -> None:
+        vector = self._prepare(embedding)
+        self._ensure_index(vector.shape[1])
+        self.remove(memory_id)
+
+        int_id = self._next_id
+        self._next_id += 1
+        self.index.add_with_ids(vector, np.array([int_id], dtype=np.int64))
+        self._memory_ids[int_id] = memory_id
+        self._int_ids[memory_id] = int_id
+
+    def add_many(self, memory_ids: List[str], embeddings,
+                 metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        vectors = np.array(embeddings, dtype=np.float32).reshape(len(memory_ids), -1)
+        faiss.normalize_L2(vectors)
+        self._ensure_index(vectors.shape[1])
+        for memory_id in memory_ids:
+            self.remove(memory_id)
+
+        int_ids = np.arange(self._next_id, self._next_id + len(memory_ids), dtype=np.int64)
+        self._next_id += len(memory_ids)
+        self.index.add_with_ids(vectors, int_ids)
+        for int_id, memory_id in zip(int_ids.tolist(), memory_ids):
+            self._memory_ids[int_id] = memory_id
+            self._int_ids[memory_id] = int_id
+
+    def remove(self, memory_id: str) -> bool:
+        int_id = self._int_ids.pop(memory_id, None)
+        if int_id is None:
+            return False
+        self.index.remove_ids(np.array([int_id], dtype=np.int64))
+        del self._memory_ids[int_id]
+        return True
+
+    def remove_many(self, memory_ids: List[str]) -> int:
+        int_ids = [self._int_ids.pop(memory_id) for memory_id in memory_ids if memory_id in self._int_ids]
+        if int_ids:
+            # A single remove_ids pass over the index for the whole batch
+            self.index.remove_ids(np.array(int_ids, dtype=np.int64))
+            for int_id in int_ids:
+                del self._memory_ids[int_id]
+        return len(int_ids)
+
+    def search(self, query_embedding, k: int, filters: Optional[Dict[str, Any]] = None,
+               conditions: Optional[List[Tuple[str, str, Any]]] = None) -> List[Tuple[str, float]]:
+        # FAISS has no view of metadata, so filters are left to the caller
+        if self.index is None or not self._int_ids:
+            return []
+        query = self._prepare(query_embedding)
+        scores, int_ids = self.index.search(query, min(k, len(self._int_ids)))
+        return [(self._memory_ids[int_id], float(score))
+                for int_id, score in zip(int_ids[0], scores[0]) if int_id != -1]
+
+    def clear(self) -> None:
+        self.index = None
+        self._memory_ids.clear()
+        self._int_ids.clear()
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._int_ids)
+
+class HNSWIndexManager(IndexManager):
+    """
+    Approximate nearest-neighbour index (hnswlib HNSW graph) over memory embeddings.
+
+    Queries visit O(log N) nodes instead of scoring every vector. Like FAISS, hnswlib
+    only takes integer labels, so memory IDs are mapped to a local counter; removed
+    labels are marked deleted and their slots reused by later inserts.
+    """
+    approximate = True
+
+    def __init__(self, dimension: Optional[int] = None, initial_capacity: int = 1024,
+                 M: int = 16, ef_construction: int = 200, ef: int = 64):
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed. Install it with `pip install mem4ai[hnsw]`")
+        self.dimension = dimension
+        self.initial_capacity = initial_capacity
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self.index = None
+        self._memory_ids: Dict[int, str] = {}
+        self._int_ids: Dict[str, int] = {}
+        self._next_id = 0
+
+    def _ensure_index(self, dimension: int, extra: int) -> None:
+        if self.index is None:
+            self.dimension = self.dimension or dimension
+            self.index = hnswlib.Index(space='cosine', dim=self.dimension)
+            self.index.init_index(max_elements=max(self.initial_capacity, extra), M=self.M,
+                                  ef_construction=self.ef_construction, allow_replace_deleted=True)
+            self.index.set_ef(self.ef)
+        elif len(self._int_ids) + extra > self.index.get_max_elements():
+            self.index.resize_index(max(self.index.get_max_elements() * 2, len(self._int_ids) + extra))
+
+    def add(self, memory_id: str, embedding, metadata: Optional[Dict[str, Any]] = None) -> None:
+        self.add_many([memory_id], [embedding])
+
+    def add_many(self, memory_ids: List[str], embeddings,
+                 metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        vectors = np.array(embeddings, dtype=np.float32).reshape(len(memory_ids), -1)
+        self._ensure_index(vectors.shape[1], len(memory_ids))
+
+        # Existing memories keep their label, so hnswlib updates their vector in place
+        labels = []
+        for memory_id in memory_ids:
+            int_id = self._int_ids.get(memory_id)
+            if int_id is None:
+                int_id = self._next_id
+                self._next_id += 1
+                self._int_ids[memory_id] = int_id
+                self._memory_ids[int_id] = memory_id
+            labels.append(int_id)
+        self.index.add_items(vectors, np.array(labels, dtype=np.int64), replace_deleted=True)
+
+    def remove(self, memory_id: str) -> bool:
+        int_id = self._int_ids.pop(memory_id, None)
+        if int_id is None:
+            return False
+        self.index.mark_deleted(int_id)
+        del self._memory_ids[int_id]
+        return True
+
+    def search(self, query_embedding, k: int, filters: Optional[Dict[str, Any]] = None,
+               conditions: Optional[List[Tuple[str, str, Any]]] = None) -> List[Tuple[str, float]]:
+        # The graph has no view of metadata, so filters are left to the caller
+        if self.index is None or not self._int_ids:
+            return []
+        k = min(k, len(self._int_ids))
+        self.index.set_ef(max(self.ef, k))
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        labels, distances = self.index.knn_query(query, k=k)
+        return [(self._memory_ids[int(label)], 1.0 - float(distance))
+                for label, distance in zip(labels[0], distances[0])]
+
+    def clear(self) -> None:
+        self.index = None
+        self._memory_ids.clear()
+        self._int_ids.clear()
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._int_ids)
+
+def get_index_manager() -> Optional[IndexManager]:
+    index_name = config_manager.get('search.index', 'numpy')
+    dtype = config_manager.get('search.index_dtype', 'float32')
+    if index_name is None:
+        return None
+    elif index_name == 'numpy':
+        return NumpyIndexManager(config_manager.get('search.index_capacity', 1024), dtype,
+                                 config_manager.get('search.index_tile_rows', 1024),
+                                 config_manager.get('search.index_filter_keys', []) or [])
+    elif index_name == 'faiss':
+        return FaissIndexManager(dtype=dtype)
+    elif index_name == 'hnsw':
+        return HNSWIndexManager(initial_capacity=config_manager.get('search.index_capacity', 1024),
+                                M=config_manager.get('search.hnsw_m', 16),
+                                ef_construction=config_manager.get('search.hnsw_ef_construction', 200),
+                                ef=config_manager.get('search.hnsw_ef', 64))
+    else:
+        raise ValueError(f"Unknown search index: {index_name}")
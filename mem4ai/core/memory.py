@@ -1,19 +1,33 @@
-import uuid, json
+import json, secrets, time
 from typing import Any, Dict, List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def datetime_to_ns(value: datetime) -> int:
+    """Nanoseconds since the epoch; naive datetimes are local time, as in Memory.timestamp."""
+    if value.tzinfo is None:
+        value = value.astimezone()
+    # Integer timedelta arithmetic, so pre-epoch fractions are not truncated toward zero
+    return (value - _EPOCH) // timedelta(microseconds=1) * 1000
 
 class Memory:
+    # No per-instance __dict__: large stores keep many Memory objects alive
+    __slots__ = ('id', 'content', 'embedding', 'context', 'metadata', 'update_history', 'timestamp_ns')
+
     def __init__(self, content: str, metadata: Optional[Dict[str, Any]] = None, 
                  embedding: Optional[Any] = None, context: Optional[Dict[str, Any]] = None,
                  user_id: Optional[str] = None, session_id: Optional[str] = None, 
                  agent_id: Optional[str] = None):
-        self.id = str(uuid.uuid4())
+        # 63-bit random id rendered as 16 hex chars: fits an int64 and keeps keys short
+        self.id = format(secrets.randbits(63), '016x')
         self.content = content
         self.embedding = embedding
         self.context = context or {}  # New field for extracted knowledge
         self.metadata = metadata or {}
         self.update_history = []
-        self.timestamp = datetime.now()
+        # Wall-clock nanoseconds; the datetime is only built when `timestamp` is read
+        self.timestamp_ns: int = time.time_ns()
         
         if user_id:
             self.metadata['user_id'] = user_id
@@ -30,12 +44,31 @@ class Memory:
             "context": self.context.copy()  # Also store context history
         })
         self.content = new_content
-        self.timestamp = datetime.now()
+        self.timestamp_ns = time.time_ns()
         if new_metadata:
             self.metadata.update(new_metadata)
         if new_context:
             self.context.update(new_context)
 
+    @property
+    def timestamp(self) -> datetime:
+        seconds, nanoseconds = divmod(self.timestamp_ns, 1_000_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000)
+
+    @timestamp.setter
+    def timestamp(self, value: datetime) -> None:
+        self.timestamp_ns = datetime_to_ns(value)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        state = dict(state)
+        # Memories pickled before timestamp_ns existed carry a datetime
+        if 'timestamp' in state:
+            self.timestamp = state.pop('timestamp')
+        for name, value in state.items():
+            setattr(self, name, value)
     
     def dumps(self) -> Dict[str, Any]:
         return json.dumps({
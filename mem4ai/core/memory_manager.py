@@ -56,13 +56,11 @@ class MemoryManager:
 
     def list_memories(self, user_id: Optional[str] = None, session_id: Optional[str] = None, 
                       agent_id: Optional[str] = None, metadata_filters: List[tuple] = None) -> List[Memory]:
-        all_memories = self.storage_strategy.list_all()
-        filtered_memories = self.storage_strategy.apply_filters(all_memories, metadata_filters or [])
-
-        return [mem for mem in filtered_memories 
-                if (not user_id or mem.metadata.get('user_id') == user_id) and
-                   (not session_id or mem.metadata.get('session_id') == session_id) and
-                   (not agent_id or mem.metadata.get('agent_id') == agent_id)]
+        if not (user_id or session_id or agent_id or metadata_filters):
+            return self.storage_strategy.list_all()
+        # Filtered while streaming from storage, so non-matching memories are never held in a list
+        return self.storage_strategy.list_filtered(user_id=user_id, session_id=session_id, agent_id=agent_id,
+                                                   metadata_filters=metadata_filters)
 
     def search_memories(self, query: str, top_k: int = 10, user_id: Optional[str] = None, 
                     session_id: Optional[str] = None, agent_id: Optional[str] = None, 
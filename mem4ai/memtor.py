@@ -1,16 +1,29 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from operator import attrgetter
 from typing import List, Optional, Dict, Any, Tuple
-from .core.embedding_manager import EmbeddingManager
+import asyncio
+import heapq
+import queue
+import threading
+from .core.embedding_manager import EmbeddingManager, l2_normalize
+from .core.index_manager import get_index_manager
+from .core.bm25_index import BM25Index
+from .utils.vector_ops import top_k_indices
+from .utils.rwlock import RWLock
 from .strategies.embedding_strategy import get_embedding_strategy, EmbeddingStrategy
 from .strategies.storage_strategy import get_storage_strategy, StorageStrategy
 from .strategies.search_strategy import get_search_strategy, SearchStrategy
 from .strategies.knowledge_extraction import get_extraction_strategy
 from .core.memory import Memory
 from .utils.config_manager import config_manager
+from .utils.filters import OPERATORS
 from datetime import datetime
+import numpy as np
 
 class Memtor:
     def __init__(self, embedding_strategy=None, storage_strategy=None, 
-             search_strategy=None, extraction_strategy=None):
+             search_strategy=None, extraction_strategy=None, load_index: bool = True):
         """
         Initialize the Memtor instance with the specified strategies.
         
@@ -19,10 +32,44 @@ class Memtor:
         :param search_strategy: Strategy for searching memories
         :param extraction_strategy: Strategy for knowledge extraction. 
                                 Can be None to disable extraction
+        :param load_index: Whether to build the vector index from storage. Without it searches
+                           scan stored embeddings, which suits short-lived instances that mostly
+                           read memories by ID
         """
         self.embedding_manager = EmbeddingManager(embedding_strategy)
         self.storage_strategy = storage_strategy or get_storage_strategy()
         self.search_strategy = search_strategy or get_search_strategy(self.embedding_manager)
+
+        # Vector index over memory embeddings, rebuilt from storage so it stays in sync with persisted memories
+        self.index_manager = get_index_manager() if load_index else None
+        # Searches share the lock; storage and index writes hold it exclusively
+        self._lock = RWLock()
+        # Runs knowledge extraction alongside embedding; created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # add_memory_background queue, worker and per-memory futures; created on first use.
+        # A future leaves _pending once its memory is processed; errors of failed ones wait in
+        # _failed, oldest dropped beyond memory.max_failed_background, until reported
+        self._background_queue: Optional[queue.SimpleQueue] = None
+        self._background_lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._failed: "OrderedDict[str, Exception]" = OrderedDict()
+        if self.index_manager is not None:
+            if set(self.index_manager.filter_keys) - set(self.index_manager.METADATA_KEYS):
+                # Extra filter columns need full metadata, which embedding entries do not carry
+                entries = ((memory.id, memory.embedding, memory.metadata)
+                           for memory in self.storage_strategy.iter_all() if memory.embedding is not None)
+            else:
+                entries = self.storage_strategy.iter_embeddings()
+            for memory_id, embedding, metadata in entries:
+                self.index_manager.add(memory_id, embedding, metadata)
+
+        # Optional corpus-wide BM25 index, shared with search strategies that can use it
+        self.bm25_index: Optional[BM25Index] = None
+        if config_manager.get('search.bm25_index', False) and hasattr(self.search_strategy, 'bm25_index'):
+            self.bm25_index = BM25Index(config_manager.get('search.bm25_k1', 1.5),
+                                        config_manager.get('search.bm25_b', 0.75))
+            self.bm25_index.add_many((memory.id, memory.content) for memory in self.storage_strategy.iter_all())
+            self.search_strategy.bm25_index = self.bm25_index
         
         # Handle extraction strategy like other strategies
         if extraction_strategy is None:
@@ -42,38 +89,268 @@ class Memtor:
         """
         Add a new memory with both user message and assistant response.
         """
+        memory = self._create_memory(user_message, assistant_response, metadata,
+                                     user_id, session_id, agent_id)
+        self._complete_memory(memory, user_message, assistant_response)
+        return memory.id
+
+    def add_memory_background(self, user_message: str, assistant_response: str,
+                              metadata: Optional[Dict[str, Any]] = None,
+                              user_id: Optional[str] = None, session_id: Optional[str] = None,
+                              agent_id: Optional[str] = None) -> str:
+        """
+        Queue a new memory and return its ID right away; extraction, embedding and storage
+        happen on a background worker. Use wait_for(memory_id) when completion matters.
+        """
+        memory = self._create_memory(user_message, assistant_response, metadata,
+                                     user_id, session_id, agent_id)
+        done = Future()
+        with self._background_lock:
+            self._pending[memory.id] = done
+            if self._background_queue is None:
+                self._background_queue = queue.SimpleQueue()
+                threading.Thread(target=self._background_worker, name='mem4ai-writer', daemon=True).start()
+        self._background_queue.put((memory, user_message, assistant_response, done))
+        return memory.id
+
+    def wait_for(self, memory_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a memory queued by add_memory_background has been stored. Do not call it
+        inside batch_writer(): the background worker needs the write lock held there.
+
+        :return: True once the memory is stored, False if the timeout expired first.
+        :raises KeyError: If the ID was never queued and is not in storage.
+        :raises Exception: Whatever made the background write fail; it is raised once, here or
+                           by background_failures().
+        """
+        with self._background_lock:
+            done = self._pending.get(memory_id)
+            error = self._failed.pop(memory_id, None) if done is None else None
+        if error is not None:
+            raise error
+        if done is None:
+            if self.storage_strategy.load(memory_id) is None:
+                raise KeyError(f"Unknown memory ID: {memory_id}")
+            return True
+        try:
+            done.result(timeout)
+        except FutureTimeoutError:
+            return False
+        except Exception:
+            with self._background_lock:
+                self._failed.pop(memory_id, None)
+            raise
+        return True
+
+    def background_failures(self) -> Dict[str, Exception]:
+        """
+        Return and forget the errors of failed add_memory_background calls that wait_for has
+        not reported yet, keyed by memory ID. Callers that never wait can poll this instead.
+        """
+        with self._background_lock:
+            failures = dict(self._failed)
+            self._failed.clear()
+        return failures
+
+    def _background_worker(self) -> None:
+        while True:
+            memory, user_message, assistant_response, done = self._background_queue.get()
+            try:
+                self._complete_memory(memory, user_message, assistant_response)
+            except Exception as e:
+                with self._background_lock:
+                    self._pending.pop(memory.id, None)
+                    self._failed[memory.id] = e
+                    while len(self._failed) > config_manager.get('memory.max_failed_background', 1000):
+                        self._failed.popitem(last=False)
+                done.set_exception(e)
+                continue
+            with self._background_lock:
+                self._pending.pop(memory.id, None)
+            done.set_result(None)
+
+    def _complete_memory(self, memory: Memory, user_message: str, assistant_response: str) -> None:
+        """
+        Extract context for and embed a new memory, then store and index it.
+        """
+        # Extraction and embedding are independent LLM calls, so extraction runs on a worker
+        # meanwhile, unless a near-duplicate's context may replace it: a running call cannot be
+        # cancelled, so extraction then waits for the embedding and the duplicate probe
+        probe = self._probes_duplicates()
+        extraction = None
+        if self.extraction_strategy is not None and not probe:
+            extraction = self._get_executor().submit(self._extract_context, user_message, assistant_response)
+
+        # Create embedding, normalized once so searches reduce to a dot product
+        memory.embedding = l2_normalize(self.embedding_manager.embed(memory.content))
+        if extraction is not None:
+            memory.context = extraction.result() or {}
+        elif self.extraction_strategy is not None:
+            context = self._duplicate_context(memory)
+            if context is None:
+                context = self._extract_context(user_message, assistant_response)
+            memory.context = context or {}
+        
+        with self._lock.write_lock():
+            self.storage_strategy.save(memory)
+            if self.index_manager is not None:
+                self.index_manager.add(memory.id, memory.embedding, memory.metadata)
+            if self.bm25_index is not None:
+                self.bm25_index.add(memory.id, memory.content)
+
+    async def add_memory_async(self, user_message: str, assistant_response: str,
+                               metadata: Optional[Dict[str, Any]] = None,
+                               user_id: Optional[str] = None, session_id: Optional[str] = None,
+                               agent_id: Optional[str] = None) -> str:
+        """
+        Awaitable add_memory: extraction and embedding run concurrently off the event loop.
+        """
+        memory = self._create_memory(user_message, assistant_response, metadata,
+                                     user_id, session_id, agent_id)
+
+        loop = asyncio.get_running_loop()
+        # As in add_memory, extraction waits for the duplicate probe when one is configured
+        probe = self._probes_duplicates()
+        extraction = None
+        if self.extraction_strategy is not None and not probe:
+            extraction = loop.run_in_executor(self._get_executor(), self._extract_context,
+                                              user_message, assistant_response)
+        embedding = await loop.run_in_executor(self._get_executor(), self.embedding_manager.embed, memory.content)
+        memory.embedding = l2_normalize(embedding)
+
+        if extraction is not None:
+            memory.context = await extraction or {}
+        elif self.extraction_strategy is not None:
+            context = await loop.run_in_executor(self._get_executor(), self._duplicate_context, memory)
+            if context is None:
+                context = await loop.run_in_executor(self._get_executor(), self._extract_context,
+                                                     user_message, assistant_response)
+            memory.context = context or {}
+
+        def save():
+            with self._lock.write_lock():
+                self.storage_strategy.save(memory)
+                if self.index_manager is not None:
+                    self.index_manager.add(memory.id, memory.embedding, memory.metadata)
+                if self.bm25_index is not None:
+                    self.bm25_index.add(memory.id, memory.content)
+
+        await loop.run_in_executor(self._get_executor(), save)
+        return memory.id
+
+    def add_memories(self, exchanges: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add several memories at once, embedding and storing them in batches.
+
+        :param exchanges: List of dicts taking the same keys as add_memory's arguments
+                          (user_message, assistant_response and optional metadata,
+                          user_id, session_id, agent_id).
+        :return: The IDs of the new memories, in input order.
+        """
+        memories = [self._create_memory(**exchange) for exchange in exchanges]
+        if not memories:
+            return []
+
+        # Extractions run on the worker pool while the batch is embedded
+        contexts = None
+        if self.extraction_strategy is not None:
+            contexts = [self._get_executor().submit(self._extract_context, exchange['user_message'],
+                                                    exchange['assistant_response'])
+                        for exchange in exchanges]
+
+        embeddings = l2_normalize(self.embedding_manager.embed_batch([memory.content for memory in memories]))
+        for i, memory in enumerate(memories):
+            memory.embedding = embeddings[i:i + 1]
+            if contexts is not None:
+                memory.context = contexts[i].result() or {}
+
+        with self._lock.write_lock():
+            self.storage_strategy.save_many(memories)
+            if self.index_manager is not None:
+                self.index_manager.add_many([memory.id for memory in memories], embeddings,
+                                            [memory.metadata for memory in memories])
+            if self.bm25_index is not None:
+                self.bm25_index.add_many((memory.id, memory.content) for memory in memories)
+        return [memory.id for memory in memories]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=config_manager.get('extraction.max_workers', 4),
+                                                thread_name_prefix='mem4ai')
+        return self._executor
+
+    def _probes_duplicates(self) -> bool:
+        """Whether adds look for a near-duplicate's context before extracting (extraction.cancel_similarity)."""
+        return (self.extraction_strategy is not None and self.index_manager is not None and
+                config_manager.get('extraction.cancel_similarity', None) is not None)
+
+    def _duplicate_context(self, memory: Memory) -> Optional[Dict[str, Any]]:
+        """
+        Context of a stored memory with the same IDs whose embedding is at least
+        extraction.cancel_similarity close to this one, or None. Disabled when unset.
+        """
+        if not self._probes_duplicates():
+            return None
+        threshold = config_manager.get('extraction.cancel_similarity')
+
+        id_filters = {key: memory.metadata[key] for key in self.index_manager.METADATA_KEYS if key in memory.metadata}
+        with self._lock.read_lock():
+            hits = self.index_manager.search(memory.embedding, config_manager.get('search.oversample', 4), id_filters)
+        for memory_id, score in hits:
+            if score < threshold:
+                break
+            match = self.storage_strategy.load(memory_id)
+            if match is not None and match.context and \
+                    all(match.metadata.get(key) == value for key, value in id_filters.items()):
+                return match.context
+        return None
+
+    def _extract_context(self, user_message: str, assistant_response: str) -> Optional[Dict[str, Any]]:
+        """
+        Run knowledge extraction, degrading to no context if it fails.
+        """
+        try:
+            return self.extraction_strategy.extract_knowledge(user_message, assistant_response)
+        except Exception as e:
+            print(f"Warning: Knowledge extraction failed: {str(e)}")
+            return None
+
+    def _create_memory(self, user_message: str, assistant_response: str,
+                       metadata: Optional[Dict[str, Any]] = None,
+                       user_id: Optional[str] = None, session_id: Optional[str] = None,
+                       agent_id: Optional[str] = None) -> Memory:
+        """
+        Build a Memory (without embedding or extracted context) from a conversation exchange.
+        """
         if not isinstance(user_message, str) or not isinstance(assistant_response, str):
             raise TypeError("Messages must be strings")
 
         # Combine messages for embedding
         combined_content = f"User: {user_message}\nAssistant: {assistant_response}"
         
-        # Extract knowledge context if strategy exists
-        context = None
-        if self.extraction_strategy is not None:
-            try:
-                context = self.extraction_strategy.extract_knowledge(user_message, assistant_response)
-            except Exception as e:
-                print(f"Warning: Knowledge extraction failed: {str(e)}")
-                context = None
-        
-        # Create embedding
-        embedding = self.embedding_manager.embed(combined_content)
-        
         # Create memory
         metadata = metadata or {}
-        memory = Memory(
+        return Memory(
             content=combined_content,
             metadata=metadata,
-            embedding=embedding,
-            context=context,
             user_id=user_id,
             session_id=session_id,
             agent_id=agent_id
         )
-        
-        self.storage_strategy.save(memory)
-        return memory.id
+
+    def batch_writer(self):
+        """
+        Context manager holding the write lock across several writes, e.g.
+
+            with memtor.batch_writer():
+                for exchange in exchanges:
+                    memtor.add_memory(**exchange)
+
+        Searches from other threads wait until the block exits. Do not call wait_for inside
+        the block: memories from add_memory_background are stored under the same lock, so
+        the wait would deadlock.
+        """
+        return self._lock.write_lock()
 
     def get_memory(self, memory_id: str) -> Optional[Memory]:
         """
@@ -101,11 +378,62 @@ class Memtor:
 
         memory = self.get_memory(memory_id)
         if memory:
+            # Metadata-only updates keep the existing embedding
+            content_changed = content != memory.content or memory.embedding is None
             memory.update(content, metadata)
-            memory.embedding = self.embedding_manager.embed(content)
-            return self.storage_strategy.update(memory_id, memory)
+            if content_changed:
+                memory.embedding = l2_normalize(self.embedding_manager.embed(content))
+            with self._lock.write_lock():
+                updated = self.storage_strategy.update(memory_id, memory)
+                if updated and self.index_manager is not None and (content_changed or metadata):
+                    self.index_manager.add(memory_id, memory.embedding, memory.metadata)
+                if updated and self.bm25_index is not None and content_changed:
+                    self.bm25_index.add(memory_id, memory.content)
+            return updated
         return False
 
+    def update_memories(self, updates: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Update several memories at once, re-embedding changed contents in one batch.
+
+        :param updates: List of dicts taking the same keys as update_memory's arguments
+                        (memory_id, content and optional metadata).
+        :return: Whether each update was successful, in input order.
+        """
+        results = [False] * len(updates)
+        memories, positions, changed = [], [], []
+        for i, update in enumerate(updates):
+            memory_id, content = update.get('memory_id'), update.get('content')
+            if not isinstance(memory_id, str) or not isinstance(content, str):
+                raise TypeError("Memory ID and content must be strings")
+
+            memory = self.get_memory(memory_id)
+            if memory is None:
+                continue
+            if content != memory.content or memory.embedding is None:
+                changed.append(len(memories))
+            memory.update(content, update.get('metadata'))
+            memories.append(memory)
+            positions.append(i)
+
+        if changed:
+            embeddings = l2_normalize(self.embedding_manager.embed_batch([memories[j].content for j in changed]))
+            for row, j in enumerate(changed):
+                memories[j].embedding = embeddings[row:row + 1]
+
+        with self._lock.write_lock():
+            updated = self.storage_strategy.update_many(memories)
+            reindex = [memory for memory, ok in zip(memories, updated) if ok]
+            if self.index_manager is not None and reindex:
+                self.index_manager.add_many([memory.id for memory in reindex],
+                                            [memory.embedding for memory in reindex],
+                                            [memory.metadata for memory in reindex])
+            if self.bm25_index is not None:
+                self.bm25_index.add_many((memory.id, memory.content) for memory in reindex)
+        for i, ok in zip(positions, updated):
+            results[i] = ok
+        return results
+
     def delete_memory(self, memory_id: str) -> bool:
         """
         Delete a memory by its ID.
@@ -116,7 +444,13 @@ class Memtor:
         if not isinstance(memory_id, str):
             raise TypeError("Memory ID must be a string")
 
-        return self.storage_strategy.delete(memory_id)
+        with self._lock.write_lock():
+            deleted = self.storage_strategy.delete(memory_id)
+            if deleted and self.index_manager is not None:
+                self.index_manager.remove(memory_id)
+            if deleted and self.bm25_index is not None:
+                self.bm25_index.remove(memory_id)
+        return deleted
 
     def delete_memories_by_user(self, user_id: str) -> int:
         """
@@ -125,12 +459,7 @@ class Memtor:
         :param user_id: The ID of the user whose memories should be deleted.
         :return: The number of memories deleted.
         """
-        memories = self.list_memories(user_id=user_id)
-        deleted_count = 0
-        for memory in memories:
-            if self.delete_memory(memory.id):
-                deleted_count += 1
-        return deleted_count
+        return self._delete_matching(user_id=user_id)
 
     def delete_memories_by_session(self, session_id: str) -> int:
         """
@@ -139,12 +468,25 @@ class Memtor:
         :param session_id: The ID of the session whose memories should be deleted.
         :return: The number of memories deleted.
         """
-        memories = self.list_memories(session_id=session_id)
-        deleted_count = 0
-        for memory in memories:
-            if self.delete_memory(memory.id):
-                deleted_count += 1
-        return deleted_count
+        return self._delete_matching(session_id=session_id)
+
+    def _delete_matching(self, **id_filters) -> int:
+        """
+        Delete every memory matching the given user/session/agent IDs in one batch.
+        """
+        with self._lock.write_lock():
+            if self.index_manager is None and self.bm25_index is None:
+                return self.storage_strategy.delete_where(**id_filters)
+            # IDs come from the storage postings rather than the in-memory index, which does
+            # not see memories other instances wrote to the same store
+            memory_ids = [memory.id for memory in self.storage_strategy.list_filtered(**id_filters)]
+
+            deleted_count = self.storage_strategy.delete_many(memory_ids)
+            if self.index_manager is not None:
+                self.index_manager.remove_many(memory_ids)
+            if self.bm25_index is not None:
+                self.bm25_index.remove_many(memory_ids)
+            return deleted_count
     
     def clear_all_storage(self) -> bool:
         """
@@ -153,7 +495,12 @@ class Memtor:
         :return: True if the operation was successful, False otherwise.
         """
         try:
-            self.storage_strategy.clear_all()
+            with self._lock.write_lock():
+                self.storage_strategy.clear_all()
+                if self.index_manager is not None:
+                    self.index_manager.clear()
+                if self.bm25_index is not None:
+                    self.bm25_index.clear()
             return True
         except Exception as e:
             print(f"Error clearing storage: {str(e)}")
@@ -170,18 +517,35 @@ class Memtor:
         :param metadata_filters: Optional list of metadata filters.
         :return: List of Memory objects that match the filters.
         """
-        all_memories = self.storage_strategy.list_all()
-        filtered_memories = [
-            mem for mem in all_memories
-            if (not user_id or mem.metadata.get('user_id') == user_id) and
-               (not session_id or mem.metadata.get('session_id') == session_id) and
-               (not agent_id or mem.metadata.get('agent_id') == agent_id)
-        ]
+        id_filters = {key: value for key, value in
+                      (('user_id', user_id), ('session_id', session_id), ('agent_id', agent_id)) if value}
+        if not id_filters and not metadata_filters:
+            return self.storage_strategy.list_all()
+
+        # Storage resolves the ID filters through its metadata postings, so memories written by
+        # other instances on the same store are listed too; the in-memory index may not have them
+        return self.storage_strategy.list_filtered(metadata_filters=metadata_filters, **id_filters)
+
+    def count_memories(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                       agent_id: Optional[str] = None,
+                       metadata_filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        """
+        Count the memories list_memories would return, without loading them where possible.
 
-        if metadata_filters:
-            filtered_memories = self.storage_strategy.apply_filters(filtered_memories, metadata_filters)
+        :param user_id: Optional user ID to filter memories.
+        :param session_id: Optional session ID to filter memories.
+        :param agent_id: Optional agent ID to filter memories.
+        :param metadata_filters: Optional list of metadata filters.
+        :return: Number of matching memories.
+        """
+        id_filters = {key: value for key, value in
+                      (('user_id', user_id), ('session_id', session_id), ('agent_id', agent_id)) if value}
+        if not id_filters and not metadata_filters:
+            return self.storage_strategy.count()
 
-        return filtered_memories
+        # Counted from the storage postings, which unlike the in-memory index include
+        # memories other instances wrote to the same store
+        return self.storage_strategy.count_filtered(metadata_filters=metadata_filters, **id_filters)
 
     def search_memories(self, query: Optional[str] = None, top_k: int = 10, 
                     start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
@@ -220,59 +584,112 @@ class Memtor:
         # Determine search mode and get initial results
         if query:
             # Semantic search mode
-            if start_time or end_time:
-                # Get time-filtered memories first
-                memories = self.storage_strategy.find_by_time(
-                    start_time or datetime.min,
-                    end_time or datetime.max,
-                    **meta_dict
-                )
-                # Then apply semantic search
-                results = self.search_strategy.search(
-                    query=query,
-                    memories=memories,
-                    top_k=top_k,
-                    keywords=keywords or [],
-                    metadata_filters=metadata_filters or []
-                )
+            if self.index_manager is not None and not (start_time or end_time):
+                memories = self._search_index(query, top_k, meta_dict, metadata_filters)
+            elif not (start_time or end_time or metadata_filters):
+                memories = self._scan_embeddings(query, top_k, meta_dict)
             else:
-                # Get filtered memories and apply semantic search
-                memories = self.storage_strategy.find_by_meta(meta_dict) if meta_dict else self.storage_strategy.list_all()
-                if metadata_filters:
-                    memories = self.storage_strategy.apply_filters(memories, metadata_filters)
-                results = self.search_strategy.search(
-                    query=query,
-                    memories=memories,
-                    top_k=top_k,
-                    keywords=keywords or [],
-                    metadata_filters=[]  # Already applied
-                )
+                # Storage applies every filter, so only the candidates get scored
+                memories = self.storage_strategy.query(start_time=start_time, end_time=end_time,
+                                                       metadata_filters=metadata_filters, **meta_dict)
+            results = self.search_strategy.search(
+                query=query,
+                memories=memories,
+                top_k=top_k,
+                keywords=keywords or [],
+                metadata_filters=[]  # Already applied
+            )
+        elif start_time or end_time or meta_dict or metadata_filters:
+            # Time and/or metadata based search
+            results = self.storage_strategy.query(start_time=start_time, end_time=end_time,
+                                                  metadata_filters=metadata_filters, **meta_dict)
         else:
-            # Non-semantic search mode
-            if start_time or end_time:
-                # Time-based search
-                results = self.storage_strategy.find_by_time(
-                    start_time or datetime.min,
-                    end_time or datetime.max,
-                    **meta_dict
-                )
-            elif meta_dict or metadata_filters:
-                # Metadata-based search
-                results = self.storage_strategy.find_by_meta(meta_dict)
-                if metadata_filters:
-                    results = self.storage_strategy.apply_filters(results, metadata_filters)
-            else:
-                # Recent memories
-                results = self.storage_strategy.find_recent(top_k, **meta_dict)
+            # Recent memories
+            results = self.storage_strategy.find_recent(top_k)
+
+        # Relevance results are already ranked; time orders only need the top_k, not a full sort
+        if sort_by == 'time_asc' and query:
+            return heapq.nsmallest(top_k, results, key=attrgetter('timestamp_ns'))
+        if sort_by == 'time_desc' or not query:
+            return heapq.nlargest(top_k, results, key=attrgetter('timestamp_ns'))
+        return results[:top_k]
 
-        # Sort results if needed
-        if sort_by != 'relevance' or not query:
-            if sort_by == 'time_desc' or not query:
-                results = sorted(results, key=lambda x: x.timestamp, reverse=True)
-            elif sort_by == 'time_asc':
-                results = sorted(results, key=lambda x: x.timestamp)
+    def _search_index(self, query: str, top_k: int, meta_dict: Dict[str, Any],
+                      metadata_filters: Optional[List[Tuple[str, str, Any]]]) -> List[Memory]:
+        """
+        Get semantic search candidates from the vector index.
 
-        return results[:top_k]
+        ID filters, and (key, op, value) filters on the index's filter_keys, are pushed
+        into the index when it supports them. Filters it cannot apply are checked on the
+        hits instead; the index is then oversampled, and the window doubles until top_k
+        hits pass or the index is exhausted. Approximate indices are oversampled as well,
+        and the search strategy reranks their candidates exactly.
+        """
+        query_embedding = self.embedding_manager.embed_query(query)
+        # Scalar conditions on keys the index keeps as columns are applied while scoring
+        pushed, residual = self._split_conditions(metadata_filters)
+
+        exact = (not residual and not self.index_manager.approximate and
+                 (not meta_dict or self.index_manager.filters_metadata))
+        k = top_k if exact else top_k * config_manager.get('search.oversample', 4)
+        while True:
+            with self._lock.read_lock():
+                hits = self.index_manager.search(query_embedding, k, meta_dict, pushed or None)
+            memories = [
+                mem for mem in self.storage_strategy.load_many([memory_id for memory_id, _ in hits])
+                if mem is not None and all(mem.metadata.get(key) == value for key, value in meta_dict.items())
+            ]
+            if residual:
+                memories = self.storage_strategy.apply_filters(memories, residual)
+            if len(memories) >= top_k or len(hits) < k:
+                return memories
+            k *= 2
+
+    def _split_conditions(self, metadata_filters: Optional[List[Tuple[str, str, Any]]]
+                          ) -> Tuple[List[Tuple[str, str, Any]], List[Tuple[str, str, Any]]]:
+        """Split metadata_filters into the scalar conditions the index can evaluate and the rest."""
+        pushed, residual = [], []
+        for condition in metadata_filters or []:
+            key, op, value = condition
+            indexed = (key in self.index_manager.filter_keys and op in OPERATORS and
+                       isinstance(value, (str, int, float, bool)))
+            (pushed if indexed else residual).append(condition)
+        return pushed, residual
+
+    def _scan_embeddings(self, query: str, top_k: int, meta_dict: Dict[str, Any],
+                         block_rows: int = 1024) -> List[Memory]:
+        """
+        Get semantic search candidates without a vector index.
+
+        (memory_id, embedding, metadata) entries are streamed from storage and scored a
+        block at a time, keeping only the running top_k, so just the winners are loaded
+        as Memory objects instead of the whole store.
+        """
+        query_embedding = l2_normalize(self.embedding_manager.embed_query(query)).reshape(-1)
+        best_ids: List[str] = []
+        best_scores = np.empty(0, dtype=np.float32)
+        block_ids, block = [], []
+
+        def merge():
+            nonlocal best_ids, best_scores
+            scores = np.concatenate([best_scores, np.vstack(block) @ query_embedding])
+            candidates = best_ids + block_ids
+            top = top_k_indices(scores, top_k)
+            best_ids, best_scores = [candidates[i] for i in top], scores[top]
+            block_ids.clear()
+            block.clear()
+
+        with self._lock.read_lock():
+            for memory_id, embedding, metadata in self.storage_strategy.iter_embeddings():
+                if any(metadata.get(key) != value for key, value in meta_dict.items()):
+                    continue
+                block_ids.append(memory_id)
+                block.append(np.asarray(embedding, dtype=np.float32).reshape(-1))
+                if len(block) == block_rows:
+                    merge()
+            if block:
+                merge()
+            return [memory for memory in self.storage_strategy.load_many(best_ids) if memory is not None]
 
     def __repr__(self):
         return f"Memtor(embedding_strategy={self.embedding_manager.embedding_strategy.__class__.__name__}, " \
@@ -1,15 +1,34 @@
 from abc import ABC, abstractmethod
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
 import os
-from litellm import embedding
+import threading
+from ..utils.lazy_litellm import embedding
 from ..utils.config_manager import config_manager
 import numpy as np
 
+# Process-wide pool for concurrent embedding requests. Its tasks never submit more work,
+# so callers already running on another pool can wait on it safely.
+_request_pool: Optional[ThreadPoolExecutor] = None
+_request_pool_lock = threading.Lock()
+
+def get_request_pool() -> ThreadPoolExecutor:
+    global _request_pool
+    with _request_pool_lock:
+        if _request_pool is None:
+            _request_pool = ThreadPoolExecutor(max_workers=config_manager.get('embedding.max_concurrency', 4),
+                                               thread_name_prefix='mem4ai-embed')
+        return _request_pool
+
 class EmbeddingStrategy(ABC):
     @abstractmethod
-    def embed(self, input: Union[str, List[str]]) -> List[List[float]]:
+    def embed(self, input: Union[str, List[str]]) -> np.ndarray:
         pass
 
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed several texts, one row per text. Backends that batch natively should override this."""
+        return np.vstack([np.asarray(self.embed(text)).reshape(1, -1) for text in texts])
+
     @property
     @abstractmethod
     def dimension(self) -> int:
@@ -21,11 +40,13 @@ class LiteLLMEmbeddingStrategy(EmbeddingStrategy):
         self._dimension = config_manager.get('embedding.dimension', 1536)  # Default for text-embedding-3-small
         self.api_key = config_manager.get('embedding.api_key', os.getenv('OPENAI_API_KEY'))
         self.input_type = config_manager.get('embedding.input_type', None)
+        self.batch_size = config_manager.get('embedding.batch_size', 256)
 
-        if 'openai' in self.model.lower():
-            os.environ['OPENAI_API_KEY'] = self.api_key
-        elif 'huggingface' in self.model.lower():
-            os.environ['HUGGINGFACE_API_KEY'] = self.api_key
+        # Only touch the environment when the key actually changes
+        env_var = 'OPENAI_API_KEY' if 'openai' in self.model.lower() else \
+                  'HUGGINGFACE_API_KEY' if 'huggingface' in self.model.lower() else None
+        if env_var and self.api_key and os.environ.get(env_var) != self.api_key:
+            os.environ[env_var] = self.api_key
 
     def embed(self, input: Union[str, List[str]]) -> np.ndarray:
         if isinstance(input, str):
@@ -44,15 +65,35 @@ class LiteLLMEmbeddingStrategy(EmbeddingStrategy):
 
         response = embedding(**kwargs)
         data = [item['embedding'] for item in response['data']]
-        return np.array(data)
+        # float32 is what the caches, indices and storage keep, so no later pass converts it
+        return np.asarray(data, dtype=np.float32)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        # One API request per batch_size texts instead of one per text, sent concurrently
+        chunks = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(chunks) == 1:
+            return self.embed(chunks[0])
+        return np.vstack(list(get_request_pool().map(self.embed, chunks)))
 
     @property
     def dimension(self) -> int:
         return self._dimension
 
+# Strategies hold no per-instance state, so one is shared per embedding config
+_strategies: Dict[str, EmbeddingStrategy] = {}
+
 def get_embedding_strategy() -> EmbeddingStrategy:
+    fingerprint = config_manager.fingerprint('embedding')
+    strategy = _strategies.get(fingerprint)
+    if strategy is not None:
+        return strategy
+
     strategy_name = config_manager.get('embedding.strategy', 'litellm')
     if strategy_name == 'litellm':
-        return LiteLLMEmbeddingStrategy()
+        strategy = LiteLLMEmbeddingStrategy()
     else:
-        raise ValueError(f"Unknown embedding strategy: {strategy_name}")
\ No newline at end of file
+        raise ValueError(f"Unknown embedding strategy: {strategy_name}")
+    if len(_strategies) >= 8:
+        del _strategies[next(iter(_strategies))]
+    _strategies[fingerprint] = strategy
+    return strategy
\ No newline at end of file
@@ -1,27 +1,39 @@
-from .base import KnowledgeExtractionStrategy
+from .base import KnowledgeExtractionStrategy, LLMKnowledgeExtractionStrategy
 from .llm import LLMExtractionStrategy
 from .summary import SummaryExtractionStrategy
 from .echo import EchoKnowledgeStrategy
 from ...utils.config_manager import config_manager
 
+# Extraction strategies only hold their config, so one is shared per extraction config
+_strategies = {}
+
 def get_extraction_strategy() -> KnowledgeExtractionStrategy:
     """
     Factory function to get the appropriate knowledge extraction strategy based on configuration.
     """
+    fingerprint = config_manager.fingerprint('extraction')
+    if fingerprint in _strategies:
+        return _strategies[fingerprint]
+
     strategy_name = config_manager.get('extraction.strategy', 'llm')
     
     if strategy_name == 'llm':
-        return LLMExtractionStrategy()
+        strategy = LLMExtractionStrategy()
     elif strategy_name == 'simple':
-        return SummaryExtractionStrategy()
+        strategy = SummaryExtractionStrategy()
     elif strategy_name == 'none':
-        return None
+        strategy = None
     else:
         raise ValueError(f"Unknown extraction strategy: {strategy_name}")
+    if len(_strategies) >= 8:
+        del _strategies[next(iter(_strategies))]
+    _strategies[fingerprint] = strategy
+    return strategy
 
 # Make these accessible when importing from knowledge_extraction
 __all__ = [
     'KnowledgeExtractionStrategy',
+    'LLMKnowledgeExtractionStrategy',
     'LLMExtractionStrategy',
     'SummaryExtractionStrategy',
     'get_extraction_strategy',
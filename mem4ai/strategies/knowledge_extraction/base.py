@@ -1,8 +1,164 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import time
+from .cache import ExtractionCache
+from ...utils.config_manager import config_manager
+from ...utils.lazy_litellm import acompletion, completion, response_format
 
 class KnowledgeExtractionStrategy(ABC):
     @abstractmethod
     def extract_knowledge(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
         """Extract knowledge from a conversation exchange."""
-        pass
\ No newline at end of file
+        pass
+
+    def extract_knowledge_batch(self, pairs: List[Tuple[str, str]],
+                                max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Extract knowledge from several exchanges on a thread pool, for callers without an event loop.
+
+        :param pairs: (user_message, assistant_response) tuples.
+        :param max_workers: Most extractions in flight at once; defaults to extraction.max_concurrency.
+        :return: One context per pair, in input order.
+        """
+        if not pairs:
+            return []
+        workers = min(max_workers or config_manager.get('extraction.max_concurrency', 8), len(pairs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Submit every pair before collecting any result, so the calls overlap
+            futures = [executor.submit(self.extract_knowledge, user, assistant) for user, assistant in pairs]
+            return [future.result() for future in futures]
+
+    async def aextract_knowledge(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        """Async variant of extract_knowledge; by default runs it on the event loop's executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.extract_knowledge, user_message, assistant_response)
+
+    async def aextract_knowledge_batch(self, pairs: List[Tuple[str, str]],
+                                       max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Extract knowledge from several exchanges concurrently.
+
+        :param pairs: (user_message, assistant_response) tuples.
+        :param max_concurrency: Most extractions in flight at once; defaults to extraction.max_concurrency.
+        :return: One context per pair, in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or config_manager.get('extraction.max_concurrency', 8))
+
+        async def extract(user_message: str, assistant_response: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aextract_knowledge(user_message, assistant_response)
+
+        return list(await asyncio.gather(*(extract(user, assistant) for user, assistant in pairs)))
+
+class LLMKnowledgeExtractionStrategy(KnowledgeExtractionStrategy):
+    """Base of strategies that extract through an LLM with structured output, caching and retries."""
+    # The pydantic model responses must match, the cache version of the prompt and the label
+    # used in error messages. Subclasses also set model, retries, retry_backoff and _cache
+    schema = None
+    prompt_version = None
+    error_label = "knowledge extraction"
+
+    @abstractmethod
+    def _messages(self, user_message: str, assistant_response: str) -> List[Dict[str, str]]:
+        """Build the chat messages for one exchange."""
+        pass
+
+    @abstractmethod
+    def _fallback(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        """Context returned when extraction fails for good."""
+        pass
+
+    def _validate(self, content: str) -> None:
+        """Raise ValueError when a response does not match the strategy's schema."""
+        self.schema.model_validate_json(content)
+
+    def _cached(self, cache_key: bytes) -> Optional[Dict[str, Any]]:
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            # Entries were structured output for this prompt version, so they are not re-validated
+            try:
+                return json.loads(cached)
+            except ValueError:
+                # Unreadable entry: drop it and extract again
+                self._cache.delete(cache_key)
+        return None
+
+    def _parse(self, content: str, cache_key: bytes) -> Dict[str, Any]:
+        # Validate before caching, so a malformed response is retried rather than stored
+        self._validate(content)
+        self._cache.put(cache_key, content, self.model, self.prompt_version)
+        return json.loads(content)
+
+    @staticmethod
+    def _feedback(messages: List[Dict[str, str]], content: str, error: Exception) -> List[Dict[str, str]]:
+        return messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": f"Your previous response had this schema error: {error}. "
+                                        "Return corrected JSON matching the schema exactly."},
+        ]
+
+    def _extract_with_retries(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        """
+        Extract one exchange through the LLM, serving repeats from the cache. A response that
+        fails validation is sent back with its error, up to extraction.retries times.
+        """
+        cache_key = ExtractionCache.key(self.model, self.prompt_version, user_message, assistant_response)
+        context = self._cached(cache_key)
+        if context is not None:
+            return context
+
+        messages = self._messages(user_message, assistant_response)
+        for attempt in range(self.retries + 1):
+            try:
+                response = completion(
+                    model=self.model,
+                    messages=messages,
+                    response_format=response_format(self.schema)
+                )
+                content = response.choices[0].message.content
+            except Exception as e:
+                print(f"Error in {self.error_label}: {str(e)}")
+                break
+            try:
+                return self._parse(content, cache_key)
+            except ValueError as e:
+                # Malformed JSON or schema mismatch: show the model its error and ask again
+                if attempt == self.retries:
+                    print(f"Error in {self.error_label}: {str(e)}")
+                    break
+                messages = self._feedback(messages, content, e)
+                time.sleep(self.retry_backoff * (attempt + 1))
+        return self._fallback(user_message, assistant_response)
+
+    async def _aextract_with_retries(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        """Async variant of _extract_with_retries."""
+        cache_key = ExtractionCache.key(self.model, self.prompt_version, user_message, assistant_response)
+        context = self._cached(cache_key)
+        if context is not None:
+            return context
+
+        messages = self._messages(user_message, assistant_response)
+        for attempt in range(self.retries + 1):
+            try:
+                response = await acompletion(
+                    model=self.model,
+                    messages=messages,
+                    response_format=response_format(self.schema)
+                )
+                content = response.choices[0].message.content
+            except Exception as e:
+                print(f"Error in {self.error_label}: {str(e)}")
+                break
+            try:
+                return self._parse(content, cache_key)
+            except ValueError as e:
+                # Malformed JSON or schema mismatch: show the model its error and ask again
+                if attempt == self.retries:
+                    print(f"Error in {self.error_label}: {str(e)}")
+                    break
+                messages = self._feedback(messages, content, e)
+                await asyncio.sleep(self.retry_backoff * (attempt + 1))
+        return self._fallback(user_message, assistant_response)
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import hashlib
+import json
+import threading
+import lmdb
+from ...utils.config_manager import config_manager
+
+# One environment per cache path, shared by every strategy in the process
+_envs: Dict[str, lmdb.Environment] = {}
+_envs_lock = threading.Lock()
+
+class ExtractionCache:
+    """
+    Content-addressable cache of extraction results.
+
+    Entries are keyed by the model, the strategy's prompt version and both messages, so
+    repeating an exchange skips the LLM call. Results live in an in-memory LRU
+    (extraction.cache_size) and, when extraction.cache_path is set, in an LMDB
+    environment that survives restarts.
+    """
+
+    def __init__(self):
+        self.cache_size: int = config_manager.get('extraction.cache_size', 1024)
+        self.cache_path: Optional[str] = config_manager.get('extraction.cache_path', None)
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._env = None
+        if self.cache_path:
+            with _envs_lock:
+                if self.cache_path not in _envs:
+                    _envs[self.cache_path] = lmdb.open(
+                        self.cache_path, map_size=config_manager.get('extraction.cache_map_size', 1024 * 1024 * 1024))
+                self._env = _envs[self.cache_path]
+
+    @staticmethod
+    def key(model: str, prompt_version: str, user_message: str, assistant_response: str) -> bytes:
+        # Length prefixes keep ("ab", "c") and ("a", "bc") apart
+        user = user_message.encode()
+        assistant = assistant_response.encode()
+        return hashlib.sha256(len(user).to_bytes(8, 'little') + user +
+                              len(assistant).to_bytes(8, 'little') + assistant +
+                              model.encode() + b'\x00' + prompt_version.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        """Cached response content for key, or None."""
+        if self.cache_size <= 0 and self._env is None:
+            return None
+        with self._lock:
+            content = self._cache.get(key)
+            if content is not None:
+                self._cache.move_to_end(key)
+                return content
+
+        if self._env is not None:
+            with self._env.begin() as txn:
+                entry = txn.get(key)
+            if entry is not None:
+                content = json.loads(entry)['content']
+                self._remember(key, content)
+                return content
+        return None
+
+    def put(self, key: bytes, content: str, model: str, prompt_version: str) -> None:
+        self._remember(key, content)
+        if self._env is not None:
+            entry = json.dumps({
+                'content': content,
+                'model': model,
+                'prompt_version': prompt_version,
+                'created': datetime.now(timezone.utc).isoformat(),
+            })
+            with self._env.begin(write=True) as txn:
+                txn.put(key, entry.encode())
+
+    def delete(self, key: bytes) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+        if self._env is not None:
+            with self._env.begin(write=True) as txn:
+                txn.delete(key)
+
+    def _remember(self, key: bytes, content: str) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = content
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -2,7 +2,6 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Literal
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
-from litellm import completion
 import os, json
 from .base import KnowledgeExtractionStrategy
 from ...utils.config_manager import config_manager
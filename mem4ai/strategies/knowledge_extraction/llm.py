@@ -1,12 +1,153 @@
-from typing import Dict, Any, List, Literal, Optional
+from typing import Dict, Any, List, Literal, Optional, Tuple
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
-from litellm import completion
+from ...utils.lazy_litellm import completion, response_format
 import os
-from .base import KnowledgeExtractionStrategy
+from .base import LLMKnowledgeExtractionStrategy
+from .cache import ExtractionCache
 from ...utils.config_manager import config_manager
 import json
 
+# Bump whenever the system prompt or MemoryContext changes, so cached extractions are not reused
+PROMPT_VERSION = 'llm-v1'
+
+_LLM_SYSTEM_PROMPT = """You are a knowledge extraction system for a movie application assistant. Your task is to analyze conversations between users and the assistant, extracting structured information about both action-based interactions (like creating lists or modifying preferences) and general conversations about movies.
+
+    Given a conversation, you must:
+    1. Identify if this is an action-based interaction (e.g., creating lists, adding movies) or a conversational interaction (e.g., discussing movies, asking opinions)
+    2. Extract all relevant information including explicit mentions and implicit context
+    3. Preserve important referenced values (movies, ratings, dates) for future use
+    4. Create a concise summary capturing the essence of the interaction
+
+    For action-based interactions, focus on:
+    - Specific actions performed (creation, modification, deletion)
+    - Changes made to lists, movies, or preferences
+    - Status of the actions performed
+
+    For conversational interactions, focus on:
+    - Main topics and themes discussed
+    - Movie-related information shared
+    - User preferences and opinions expressed
+
+    Example 1 (Action-based):
+    User message: "Create a new list called 'Horror Nights' and add some recent psychological horror movies with good ratings."
+    Assistant response: {"action":"create_list", "list_id":"hn_123", "movies":[{"title":"Talk to Me","year":2023,"rating":7.1},{"title":"Hereditary","year":2018,"rating":7.3}]} I've created your 'Horror Nights' list and added some highly-rated psychological horror films. Would you like to see more options?
+
+    {
+        "timestamp": "2024-10-31T14:30:00Z",
+        "interaction_type": "action_based",
+        "action_details": {
+            "primary_action": {
+                "type": "creation",
+                "target": "custom_list",
+                "status": "completed"
+            },
+            "modified_elements": {
+                "lists": ["Horror Nights"],
+                "movies": ["Talk to Me", "Hereditary"],
+                "preferences": ["psychological horror"]
+            }
+        },
+        "conversation_details": {
+            "intent": "movie_organization",
+            "topic": "horror movies",
+            "key_information": {
+                "explicit_mentions": ["horror", "psychological", "recent"],
+                "implicit_context": ["user prefers quality over quantity"],
+                "referenced_values": {
+                    "movies": ["Talk to Me", "Hereditary"],
+                    "ratings": ["7.1", "7.3"],
+                    "dates": ["2023", "2018"],
+                    "other_values": []
+                }
+            },
+            "user_message": "Create a new list called 'Horror Nights' and add some recent psychological horror movies with good ratings.",
+            "assistant_response": "I've created your 'Horror Nights' list and added some highly-rated psychological horror films. Would you like to see more options?"
+        },
+        "summary": {
+            "request_essence": "Create new horror movie list with recent, well-rated films",
+            "response_essence": "Created list with two psychological horror movies",
+            "key_points": ["List creation", "Focus on psychological horror", "Recent releases", "High ratings"]
+        }
+    }
+
+    Example 2 (Conversational):
+    User message: "What did you think about the ending of Hereditary? Was it too disturbing?"
+    Assistant response: "The ending of Hereditary is particularly impactful because it completes the family's tragic arc. The final treehouse scene reveals the cult's true purpose. While disturbing, it serves the story's themes of family trauma and fate perfectly."
+
+    {
+        "timestamp": "2024-10-31T14:35:00Z",
+        "interaction_type": "conversational",
+        "action_details": null,
+        "conversation_details": {
+            "intent": "information_query",
+            "topic": "movie analysis",
+            "key_information": {
+                "explicit_mentions": ["Hereditary", "ending", "disturbing"],
+                "implicit_context": ["user seeking opinion", "concerned about content intensity"],
+                "referenced_values": {
+                    "movies": ["Hereditary"],
+                    "ratings": [],
+                    "dates": [],
+                    "other_values": ["treehouse scene", "family trauma", "cult"]
+                }
+            },
+            "user_message": "What did you think about the ending of Hereditary? Was it too disturbing?",
+            "assistant_response": "The ending of Hereditary is particularly impactful because it completes the family's tragic arc. The final treehouse scene reveals the cult's true purpose. While disturbing, it serves the story's themes of family trauma and fate perfectly."
+        },
+        "summary": {
+            "request_essence": "Opinion request about Hereditary's ending",
+            "response_essence": "Analysis of ending's significance and themes",
+            "key_points": ["Movie analysis", "Thematic discussion", "Content intensity"]
+        }
+    }
+
+    Required Response Format:
+    Your response must strictly follow this schema:
+    {
+        "timestamp": string (ISO format),
+        "interaction_type": "action_based" | "conversational" | "information_seeking",
+        "action_details": {  // Optional, null for non-action interactions
+            "primary_action": {
+                "type": "list_modification" | "search" | "creation" | "deletion",
+                "target": "favorites_list" | "watch_later" | "custom_list",
+                "status": "completed" | "failed" | "partial"
+            },
+            "modified_elements": {
+                "lists": [string],  // Required, can be empty
+                "movies": [string],  // Required, can be empty
+                "preferences": [string]  // Required, can be empty
+            }
+        },
+        "conversation_details": {
+            "intent": "movie_organization" | "information_query" | "general_discussion",
+            "topic": string,
+            "key_information": {
+                "explicit_mentions": [string],  // Required
+                "implicit_context": [string],  // Required
+                "referenced_values": {
+                    "movies": [string],  // Required
+                    "ratings": [string],  // Required
+                    "dates": [string],  // Required
+                    "other_values": [string]  // Required
+                }
+            },
+            "user_message": string,  // Original message
+            "assistant_response": string  // Original response
+        },
+        "summary": {
+            "request_essence": string,
+            "response_essence": string,
+            "key_points": [string]  // Required
+        }
+    }"""
+
+# Appended to the system prompt when several exchanges share one request
+_LLM_MARSHALED_INSTRUCTIONS = """
+
+    You will receive a JSON array of exchanges, each with an "id", a "user" message and an "assistant" response.
+    Analyze every exchange independently and return {"contexts": [...]} holding exactly one memory context per exchange, in the same order and with the same length as the input array."""
+
 # Pydantic models for structured knowledge extraction
 class ActionDetails(BaseModel):    
     type: Literal['list_modification', 'search', 'creation', 'deletion'] = Field(
@@ -154,7 +295,19 @@ class MemoryContext(BaseModel):
     class Config:
         extra = 'forbid'
 
-class LLMExtractionStrategy(KnowledgeExtractionStrategy):
+class MemoryContextBatch(BaseModel):
+    contexts: List[MemoryContext] = Field(
+        ...,
+        description="One context per input exchange, in input order"
+    )
+
+    class Config:
+        extra = 'forbid'
+
+class LLMExtractionStrategy(LLMKnowledgeExtractionStrategy):
+    schema = MemoryContext
+    prompt_version = PROMPT_VERSION
+
     def __init__(self):
         self.model = config_manager.get('extraction.model', 'gpt-4o-mini')
         self.api_key = config_manager.get('extraction.api_key', os.getenv('OPENAI_API_KEY'))
@@ -163,171 +316,89 @@ class LLMExtractionStrategy(KnowledgeExtractionStrategy):
             raise ValueError("No API key found for LLM extraction")
             
         os.environ['OPENAI_API_KEY'] = self.api_key
+        self.retries = config_manager.get('extraction.retries', 2)
+        self.retry_backoff = config_manager.get('extraction.retry_backoff', 1.0)
+        self._cache = ExtractionCache()
+        self._system_prompt = _LLM_SYSTEM_PROMPT
+        self._marshaled_prompt = _LLM_SYSTEM_PROMPT + _LLM_MARSHALED_INSTRUCTIONS
 
-    def _create_system_prompt(self) -> str:
-        return """You are a knowledge extraction system for a movie application assistant. Your task is to analyze conversations between users and the assistant, extracting structured information about both action-based interactions (like creating lists or modifying preferences) and general conversations about movies.
+    def _messages(self, user_message: str, assistant_response: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self._system_prompt},
+            {"role": "user", "content": f"User message: {user_message}\nAssistant response: {assistant_response}"}
+        ]
 
-    Given a conversation, you must:
-    1. Identify if this is an action-based interaction (e.g., creating lists, adding movies) or a conversational interaction (e.g., discussing movies, asking opinions)
-    2. Extract all relevant information including explicit mentions and implicit context
-    3. Preserve important referenced values (movies, ratings, dates) for future use
-    4. Create a concise summary capturing the essence of the interaction
+    def extract_knowledge(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        return self._extract_with_retries(user_message, assistant_response)
 
-    For action-based interactions, focus on:
-    - Specific actions performed (creation, modification, deletion)
-    - Changes made to lists, movies, or preferences
-    - Status of the actions performed
+    async def aextract_knowledge(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        return await self._aextract_with_retries(user_message, assistant_response)
 
-    For conversational interactions, focus on:
-    - Main topics and themes discussed
-    - Movie-related information shared
-    - User preferences and opinions expressed
+    def extract_knowledge_marshaled(self, pairs: List[Tuple[str, str]], k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Extract knowledge from many short exchanges, packing up to k of them into each LLM
+        request. Fewer requests ease rate limits at the cost of longer individual calls;
+        returns diminish beyond about 8 exchanges per request.
 
-    Example 1 (Action-based):
-    User message: "Create a new list called 'Horror Nights' and add some recent psychological horror movies with good ratings."
-    Assistant response: {"action":"create_list", "list_id":"hn_123", "movies":[{"title":"Talk to Me","year":2023,"rating":7.1},{"title":"Hereditary","year":2018,"rating":7.3}]} I've created your 'Horror Nights' list and added some highly-rated psychological horror films. Would you like to see more options?
+        :param pairs: (user_message, assistant_response) tuples.
+        :param k: Exchanges per request.
+        :return: One context per pair, in input order.
+        """
+        keys = [ExtractionCache.key(self.model, PROMPT_VERSION, user, assistant) for user, assistant in pairs]
+        contexts = [self._cached(key) for key in keys]
+        missing = [i for i, context in enumerate(contexts) if context is None]
 
-    {
-        "timestamp": "2024-10-31T14:30:00Z",
-        "interaction_type": "action_based",
-        "action_details": {
-            "primary_action": {
-                "type": "creation",
-                "target": "custom_list",
-                "status": "completed"
-            },
-            "modified_elements": {
-                "lists": ["Horror Nights"],
-                "movies": ["Talk to Me", "Hereditary"],
-                "preferences": ["psychological horror"]
-            }
-        },
-        "conversation_details": {
-            "intent": "movie_organization",
-            "topic": "horror movies",
-            "key_information": {
-                "explicit_mentions": ["horror", "psychological", "recent"],
-                "implicit_context": ["user prefers quality over quantity"],
-                "referenced_values": {
-                    "movies": ["Talk to Me", "Hereditary"],
-                    "ratings": ["7.1", "7.3"],
-                    "dates": ["2023", "2018"],
-                    "other_values": []
-                }
-            },
-            "user_message": "Create a new list called 'Horror Nights' and add some recent psychological horror movies with good ratings.",
-            "assistant_response": "I've created your 'Horror Nights' list and added some highly-rated psychological horror films. Would you like to see more options?"
-        },
-        "summary": {
-            "request_essence": "Create new horror movie list with recent, well-rated films",
-            "response_essence": "Created list with two psychological horror movies",
-            "key_points": ["List creation", "Focus on psychological horror", "Recent releases", "High ratings"]
-        }
-    }
-
-    Example 2 (Conversational):
-    User message: "What did you think about the ending of Hereditary? Was it too disturbing?"
-    Assistant response: "The ending of Hereditary is particularly impactful because it completes the family's tragic arc. The final treehouse scene reveals the cult's true purpose. While disturbing, it serves the story's themes of family trauma and fate perfectly."
-
-    {
-        "timestamp": "2024-10-31T14:35:00Z",
-        "interaction_type": "conversational",
-        "action_details": null,
-        "conversation_details": {
-            "intent": "information_query",
-            "topic": "movie analysis",
-            "key_information": {
-                "explicit_mentions": ["Hereditary", "ending", "disturbing"],
-                "implicit_context": ["user seeking opinion", "concerned about content intensity"],
-                "referenced_values": {
-                    "movies": ["Hereditary"],
-                    "ratings": [],
-                    "dates": [],
-                    "other_values": ["treehouse scene", "family trauma", "cult"]
-                }
-            },
-            "user_message": "What did you think about the ending of Hereditary? Was it too disturbing?",
-            "assistant_response": "The ending of Hereditary is particularly impactful because it completes the family's tragic arc. The final treehouse scene reveals the cult's true purpose. While disturbing, it serves the story's themes of family trauma and fate perfectly."
-        },
-        "summary": {
-            "request_essence": "Opinion request about Hereditary's ending",
-            "response_essence": "Analysis of ending's significance and themes",
-            "key_points": ["Movie analysis", "Thematic discussion", "Content intensity"]
-        }
-    }
-
-    Required Response Format:
-    Your response must strictly follow this schema:
-    {
-        "timestamp": string (ISO format),
-        "interaction_type": "action_based" | "conversational" | "information_seeking",
-        "action_details": {  // Optional, null for non-action interactions
-            "primary_action": {
-                "type": "list_modification" | "search" | "creation" | "deletion",
-                "target": "favorites_list" | "watch_later" | "custom_list",
-                "status": "completed" | "failed" | "partial"
-            },
-            "modified_elements": {
-                "lists": [string],  // Required, can be empty
-                "movies": [string],  // Required, can be empty
-                "preferences": [string]  // Required, can be empty
-            }
-        },
-        "conversation_details": {
-            "intent": "movie_organization" | "information_query" | "general_discussion",
-            "topic": string,
-            "key_information": {
-                "explicit_mentions": [string],  // Required
-                "implicit_context": [string],  // Required
-                "referenced_values": {
-                    "movies": [string],  // Required
-                    "ratings": [string],  // Required
-                    "dates": [string],  // Required
-                    "other_values": [string]  // Required
-                }
-            },
-            "user_message": string,  // Original message
-            "assistant_response": string  // Original response
-        },
-        "summary": {
-            "request_essence": string,
-            "response_essence": string,
-            "key_points": [string]  // Required
-        }
-    }"""
+        for start in range(0, len(missing), max(k, 1)):
+            chunk = missing[start:start + max(k, 1)]
+            exchanges = [{"id": n, "user": pairs[i][0], "assistant": pairs[i][1]} for n, i in enumerate(chunk)]
+            try:
+                response = completion(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": self._marshaled_prompt},
+                        {"role": "user", "content": json.dumps(exchanges)}
+                    ],
+                    response_format=response_format(MemoryContextBatch)
+                )
+                content = response.choices[0].message.content
+                MemoryContextBatch.model_validate_json(content)
+                batch = json.loads(content)['contexts']
+                if len(batch) != len(chunk):
+                    raise ValueError(f"Expected {len(chunk)} contexts, got {len(batch)}")
+            except Exception as e:
+                print(f"Error in marshaled knowledge extraction, extracting one by one: {str(e)}")
+                for i in chunk:
+                    contexts[i] = self.extract_knowledge(*pairs[i])
+                continue
 
+            for i, context in zip(chunk, batch):
+                contexts[i] = context
+                self._cache.put(keys[i], json.dumps(context), self.model, PROMPT_VERSION)
+        return contexts
 
-    def extract_knowledge(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
-        messages = [
-            {"role": "system", "content": self._create_system_prompt()},
-            {"role": "user", "content": f"User message: {user_message}\nAssistant response: {assistant_response}"}
-        ]
-      
-        try:
-            response = completion(
-                model=self.model,
-                messages=messages,
-                response_format=MemoryContext
-            )
-            
-            return json.loads(response.model_dump()['choices'][0]['message']['content'])
-        except Exception as e:
-            print(f"Error in knowledge extraction: {str(e)}")
-            # Return a basic context on error
-            return MemoryContext(
-                timestamp=datetime.now(),
-                interaction_type="conversational",
-                conversation_details=ConversationDetails(
-                    intent="general_discussion",
-                    topic="general",
-                    original_exchange={
-                        "user_message": user_message,
-                        "assistant_response": assistant_response
-                    }
+    def _fallback(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        # Return a basic context on error. The fields are fixed by this code, so
+        # model_construct skips validation; never use it for LLM or user data.
+        return MemoryContext.model_construct(
+            timestamp=datetime.now().isoformat(),
+            interaction_type="conversational",
+            action_details=None,
+            conversation_details=ConversationDetails.model_construct(
+                intent="general_discussion",
+                topic="general",
+                key_information=KeyInformation.model_construct(
+                    explicit_mentions=[],
+                    implicit_context=[],
+                    referenced_values=ReferencedValues.model_construct(
+                        movies=[], ratings=[], dates=[], other_values=[]
+                    )
                 ),
-                summary=Summary(
-                    request_essence="Error in extraction",
-                    response_essence="Error in extraction",
-                    key_points=["Error in knowledge extraction"]
-                )
-            ).model_dump()
\ No newline at end of file
+                user_message=user_message,
+                assistant_response=assistant_response
+            ),
+            summary=Summary.model_construct(
+                request_essence="Error in extraction",
+                response_essence="Error in extraction",
+                key_points=["Error in knowledge extraction"]
+            )
+        ).model_dump()
\ No newline at end of file
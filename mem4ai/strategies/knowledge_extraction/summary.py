@@ -2,39 +2,15 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Literal
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
-from litellm import completion
-import os, json
-from .base import KnowledgeExtractionStrategy
+import os
+from .base import LLMKnowledgeExtractionStrategy
+from .cache import ExtractionCache
 from ...utils.config_manager import config_manager
 
+# Bump whenever the system prompt or SimpleSummaryContext changes, so cached extractions are not reused
+PROMPT_VERSION = "summary-v1"
 
-class SimpleSummaryContext(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-
-    timestamp: str = Field(..., description="Timestamp of the interaction")
-    summary: str = Field(..., description="Concise summary of the interaction")
-    keywords: List[str] = Field(
-        ..., description="Key terms and concepts from the conversation"
-    )
-    interaction_type: Literal["task", "discussion", "query"] = Field(
-        ..., description="Basic type of the interaction"
-    )
-
-
-class SummaryExtractionStrategy(KnowledgeExtractionStrategy):
-    def __init__(self):
-        self.model = config_manager.get("extraction.model", "gpt-4o-mini")
-        self.api_key = config_manager.get(
-            "extraction.api_key", os.getenv("OPENAI_API_KEY")
-        )
-
-        if not self.api_key:
-            raise ValueError("No API key found for LLM extraction")
-
-        os.environ["OPENAI_API_KEY"] = self.api_key
-
-    def _create_system_prompt(self) -> str:
-        return """You are a knowledge extraction system focusing on creating concise summaries and extracting keywords from conversations. Your task is to analyze conversations and produce a simple, focused summary of what was discussed or accomplished.
+_SUMMARY_SYSTEM_PROMPT = """You are a knowledge extraction system focusing on creating concise summaries and extracting keywords from conversations. Your task is to analyze conversations and produce a simple, focused summary of what was discussed or accomplished.
 
 Given a conversation between a user and an assistant, you must:
 1. Create a brief, informative summary of the interaction
@@ -71,31 +47,69 @@ Required Response Format:
     "interaction_type": "task" | "discussion" | "query"
 }"""
 
-    def extract_knowledge(
+
+class SimpleSummaryContext(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    timestamp: str = Field(..., description="Timestamp of the interaction")
+    summary: str = Field(..., description="Concise summary of the interaction")
+    keywords: List[str] = Field(
+        ..., description="Key terms and concepts from the conversation"
+    )
+    interaction_type: Literal["task", "discussion", "query"] = Field(
+        ..., description="Basic type of the interaction"
+    )
+
+
+class SummaryExtractionStrategy(LLMKnowledgeExtractionStrategy):
+    schema = SimpleSummaryContext
+    prompt_version = PROMPT_VERSION
+    error_label = "simple knowledge extraction"
+
+    def __init__(self):
+        self.model = config_manager.get("extraction.model", "gpt-4o-mini")
+        self.api_key = config_manager.get(
+            "extraction.api_key", os.getenv("OPENAI_API_KEY")
+        )
+
+        if not self.api_key:
+            raise ValueError("No API key found for LLM extraction")
+
+        os.environ["OPENAI_API_KEY"] = self.api_key
+        self.retries = config_manager.get("extraction.retries", 2)
+        self.retry_backoff = config_manager.get("extraction.retry_backoff", 1.0)
+        self._cache = ExtractionCache()
+        self._system_prompt = _SUMMARY_SYSTEM_PROMPT
+
+    def _messages(
         self, user_message: str, assistant_response: str
-    ) -> Dict[str, Any]:
-        messages = [
-            {"role": "system", "content": self._create_system_prompt()},
+    ) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self._system_prompt},
             {
                 "role": "user",
                 "content": f"User message: {user_message}\nAssistant response: {assistant_response}",
             },
         ]
 
-        try:
-            response = completion(
-                model=self.model,
-                messages=messages,
-                response_format=SimpleSummaryContext,
-            )
-
-            return json.loads(response.model_dump()["choices"][0]["message"]["content"])
-        except Exception as e:
-            print(f"Error in simple knowledge extraction: {str(e)}")
-            # Return a basic context on error
-            return SimpleSummaryContext(
-                timestamp=datetime.now().isoformat(),
-                summary="Error occurred during extraction",
-                keywords=["error"],
-                interaction_type="discussion",
-            ).model_dump()
+    def extract_knowledge(
+        self, user_message: str, assistant_response: str
+    ) -> Dict[str, Any]:
+        return self._extract_with_retries(user_message, assistant_response)
+
+    async def aextract_knowledge(
+        self, user_message: str, assistant_response: str
+    ) -> Dict[str, Any]:
+        return await self._aextract_with_retries(user_message, assistant_response)
+
+    def _fallback(
+        self, user_message: str, assistant_response: str
+    ) -> Dict[str, Any]:
+        # Return a basic context on error. The fields are fixed by this code, so
+        # model_construct skips validation; never use it for LLM or user data.
+        return SimpleSummaryContext.model_construct(
+            timestamp=datetime.now().isoformat(),
+            summary="Error occurred during extraction",
+            keywords=["error"],
+            interaction_type="discussion",
+        ).model_dump()
@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List, Union, Dict, Any, Tuple
+from typing import List, Optional, Union, Dict, Any, Tuple
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from ..core.memory import Memory
 from ..utils.config_manager import config_manager
-from ..core.embedding_manager import EmbeddingManager
+from ..core.embedding_manager import EmbeddingManager, l2_normalize
+from ..core.bm25_index import BM25Index
+from ..utils.vector_ops import cosine_scores, top_k_indices
+from ..utils.filters import apply_metadata_filters
 
 class SearchStrategy(ABC):
     @abstractmethod
@@ -16,9 +17,12 @@ class SearchStrategy(ABC):
 class DefaultSearchStrategy:
     def __init__(self, embedding_manager: EmbeddingManager):
         self.embedding_manager = embedding_manager
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+        self._tfidf_vectorizer = None
         self.k1: float = config_manager.get('search.bm25_k1', 1.5)
         self.b: float = config_manager.get('search.bm25_b', 0.75)
+        # Corpus-wide BM25 index kept up to date by Memtor when search.bm25_index is on;
+        # otherwise BM25 statistics are computed over the reranked candidates per query
+        self.bm25_index: Optional[BM25Index] = None
 
     def search(self, query: Union[str, np.ndarray], memories: List[Memory], top_k: int, 
                keywords: List[str], metadata_filters: List[Tuple[str, str, Any]]) -> List[Memory]:
@@ -43,15 +47,14 @@ class DefaultSearchStrategy:
         # Stage 1: Cosine Similarity
         try:
             if isinstance(query, str):
-                query_embedding = self.embedding_manager.embed(query)
-            elif isinstance(query, np.ndarray) and query.dtype == float:
+                query_embedding = self.embedding_manager.embed_query(query)
+            elif isinstance(query, np.ndarray) and np.issubdtype(query.dtype, np.floating):
                 query_embedding = query
             else:
                 raise TypeError("query must be a string or a numpy array of floats")
             
             cosine_scores = self._calculate_cosine_similarity(query_embedding, filtered_memories)
-            top_k = min(top_k, len(filtered_memories))
-            top_cosine_indices = np.argsort(cosine_scores)[-top_k:][::-1]
+            top_cosine_indices = top_k_indices(cosine_scores, top_k)
             top_memories = [filtered_memories[i] for i in top_cosine_indices]
         except Exception as e:
             print(f"Error during cosine similarity calculation: {str(e)}")
@@ -61,93 +64,105 @@ class DefaultSearchStrategy:
         if isinstance(query, str):
             try:
                 bm25_scores = self._calculate_bm25_scores(query, top_memories, keywords)
-                final_indices = np.argsort(bm25_scores)[::-1]
-                if final_indices == [0]:
+                if len(bm25_scores) <= 1:
                     return top_memories
+                # Stable descending sort, so memories BM25 cannot tell apart keep their cosine order
+                final_indices = np.argsort(-np.asarray(bm25_scores), kind='stable')
                 return [top_memories[i] for i in final_indices]
-            except Exception as e:
+            except (ValueError, IndexError) as e:
                 print(f"Error during BM25 re-ranking: {str(e)}")
                 return top_memories  # Fall back to cosine similarity results if BM25 fails
         else:
             return top_memories
 
-    def _apply_metadata_filters(self, memories, filters):
-        if not filters:
-            return memories
-
-        def passes_filter(memory, filter_tuple):
-            key, op, value = filter_tuple
-            if key not in memory.metadata:
-                return False
-            mem_value = memory.metadata[key]
-            if op == '==':
-                return mem_value == value
-            elif op == '!=':
-                return mem_value != value
-            elif op == '>':
-                return mem_value > value
-            elif op == '>=':
-                return mem_value >= value
-            elif op == '<':
-                return mem_value < value
-            elif op == '<=':
-                return mem_value <= value
-            else:
-                raise ValueError(f"Unknown operator: {op}")
+    @property
+    def tfidf_vectorizer(self):
+        # Built on first use, so scikit-learn is only imported once per-query BM25 runs
+        if self._tfidf_vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self._tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+        return self._tfidf_vectorizer
 
-        return [mem for mem in memories if all(passes_filter(mem, f) for f in filters)]
+    def _apply_metadata_filters(self, memories, filters):
+        return apply_metadata_filters(memories, filters)
 
     def _calculate_cosine_similarity(self, query_embedding : np.ndarray, memories : List[Memory]) -> np.ndarray:
-        memory_embeddings = np.array([memory.embedding[0] for memory in memories])
-        
-        if memory_embeddings.shape[0] == 0:
+        if not memories:
             return np.array([])
-        
-        # Ensure query_embedding is 2D
-        if query_embedding.ndim == 1:
-            query_embedding = query_embedding.reshape(1, -1)
-        
-        # Ensure memory_embeddings is 2D
-        if memory_embeddings.ndim == 1:
-            memory_embeddings = memory_embeddings.reshape(1, -1)
-        
-        # return cosine_similarity(query_embedding, memory_embeddings)[0]
-        return np.dot(memory_embeddings, query_embedding.T).flatten()
+
+        # Gather rows straight into one contiguous float32 matrix, so scoring is a single sgemv
+        # rather than a float64 product over an array built from a list of rows
+        first = memories[0].embedding.reshape(-1)
+        memory_embeddings = np.empty((len(memories), first.shape[0]), dtype=np.float32)
+        for row, memory in enumerate(memories):
+            memory_embeddings[row] = memory.embedding.reshape(-1)
+
+        # Stored embeddings are normalized at write time, so only the query needs it
+        query_embedding = l2_normalize(query_embedding).reshape(-1)
+        return memory_embeddings @ query_embedding
 
     def _calculate_bm25_scores(self, query : str, memories : List[Memory], keywords : List[str]) -> np.ndarray:
+        if self.bm25_index is not None:
+            return self.bm25_index.score(query, [memory.id for memory in memories], keywords).tolist()
         try:
             corpus = [memory.content for memory in memories]
             tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
-            doc_lens = tfidf_matrix.sum(axis=1).flatten()  # Sum across rows and flatten
+            doc_lens = np.asarray(tfidf_matrix.sum(axis=1)).ravel()
             avg_doc_len = doc_lens.mean()
 
             query_vec = self.tfidf_vectorizer.transform([query])
             query_terms = query_vec.indices
 
-            keyword_boost = np.zeros(len(memories))
-            for keyword in keywords:
-                if keyword in self.tfidf_vectorizer.vocabulary_:
-                    keyword_idx = self.tfidf_vectorizer.vocabulary_[keyword]
-                    keyword_boost += tfidf_matrix[:, keyword_idx].toarray().flatten()
-
-            scores = np.zeros(len(memories))
-            for idx in query_terms:
-                qi = np.array(query_vec[0, idx])
-                fi = tfidf_matrix[:, idx].toarray().flatten()
-                numerator = fi * (self.k1 + 1)
-                denominator = fi + self.k1 * (1 - self.b + self.b * doc_lens / avg_doc_len)
-                x = qi * (numerator / denominator)
-                scores = scores + x
-
-            final_scores = scores + keyword_boost
-            return final_scores.tolist()[0]
+            vocabulary = self.tfidf_vectorizer.vocabulary_
+            keyword_terms = [vocabulary[keyword] for keyword in keywords if keyword in vocabulary]
+            keyword_boost = np.asarray(tfidf_matrix[:, keyword_terms].sum(axis=1)).ravel()
+
+            # All query terms at once: the (documents x query terms) slice is small and dense
+            fi = tfidf_matrix[:, query_terms].toarray()
+            qi = query_vec[0, query_terms].toarray().ravel()
+            numerator = fi * (self.k1 + 1)
+            denominator = fi + (self.k1 * (1 - self.b + self.b * doc_lens / avg_doc_len))[:, None]
+            scores = np.divide(numerator, denominator, out=np.zeros_like(numerator),
+                               where=denominator > 0) @ qi
+
+            return (scores + keyword_boost).tolist()
         except Exception as e:
                 print(f"Error in BM25 calculation: {str(e)}")
                 return [0.0] * len(memories)  # Return neutral scores if calculation fails
 
+class NumbaAcceleratedSearchStrategy(SearchStrategy):
+    """
+    Base class for custom embedding-based search strategies.
+
+    Cosine scoring over the candidate memories runs in a compiled, parallel kernel when
+    numba is installed (NumPy otherwise); subclasses customize ranking by overriding rerank().
+    """
+
+    def __init__(self, embedding_manager: EmbeddingManager = None):
+        self.embedding_manager = embedding_manager or EmbeddingManager()
+
+    def search(self, query: Union[str, np.ndarray], memories: List[Memory], top_k: int, 
+               keywords: List[str], metadata_filters: List[Tuple[str, str, Any]]) -> List[Memory]:
+        memories = [mem for mem in apply_metadata_filters(memories, metadata_filters) if mem.embedding is not None]
+        if not memories:
+            return []
+
+        query_embedding = self.embedding_manager.embed_query(query) if isinstance(query, str) else query
+        matrix = np.vstack([np.asarray(mem.embedding, dtype=np.float32).reshape(1, -1) for mem in memories])
+        scores = cosine_scores(matrix, query_embedding)
+
+        top = top_k_indices(scores, top_k)
+        return self.rerank(query, [memories[i] for i in top], keywords)
+
+    def rerank(self, query: Union[str, np.ndarray], memories: List[Memory], keywords: List[str]) -> List[Memory]:
+        """Reorder the top cosine matches; the default keeps cosine order."""
+        return memories
+
 def get_search_strategy(embedding_manager=None):
     strategy_name = config_manager.get('search.strategy', 'default')
     if strategy_name == 'default':
         return DefaultSearchStrategy(embedding_manager or EmbeddingManager())
+    elif strategy_name == 'numba':
+        return NumbaAcceleratedSearchStrategy(embedding_manager or EmbeddingManager())
     else:
         raise ValueError(f"Unknown search strategy: {strategy_name}")
\ No newline at end of file
@@ -1,33 +1,163 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 import os
+import json
+import struct
+import threading
 import lmdb
 import pickle
+import numpy as np
 from datetime import datetime, timedelta
-from ..core.memory import Memory
+from ..core.memory import Memory, datetime_to_ns
 from ..utils.config_manager import config_manager
+from ..utils.filters import compile_filters
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# One environment per path, shared by every storage strategy in the process: LMDB must not have
+# the same environment open twice in a process, and reopening a store then costs nothing. Kept
+# with the options it was opened with, which later opens cannot change
+_envs: Dict[str, Tuple[lmdb.Environment, Dict[str, Any]]] = {}
+_envs_lock = threading.Lock()
+
+class _DecodedCache:
+    """LRU of decoded memories by ID, shared by every storage strategy on the same store in this process"""
+
+    def __init__(self):
+        self.entries: "OrderedDict[bytes, Memory]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0  # Bumped by every write, so reads from older snapshots are not cached
+
+# Keyed like _envs by the store's absolute path
+_decoded_caches: Dict[str, _DecodedCache] = {}
+
+# msgpack extension code of numpy arrays: uint8 dtype length, dtype string, uint8 ndim,
+# uint64 per dimension, then the raw data
+_NDARRAY_EXT = 1
+
+# Types msgpack round-trips unchanged; tuples, sets and naive datetimes would come back as lists and strings
+_MSGPACK_SCALARS = (str, int, float, bool, type(None), np.ndarray, np.generic)
+
+def _msgpack_safe(obj: Any) -> bool:
+    if isinstance(obj, _MSGPACK_SCALARS):
+        return True
+    if type(obj) is list:
+        return all(_msgpack_safe(item) for item in obj)
+    if type(obj) is dict:
+        return all(type(key) is str and _msgpack_safe(value) for key, value in obj.items())
+    return False
+
+def _enc_hook(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        dtype = obj.dtype.str.encode()
+        header = struct.pack(f'<B{len(dtype)}sB{obj.ndim}Q', len(dtype), dtype, obj.ndim, *obj.shape)
+        return msgspec.msgpack.Ext(_NDARRAY_EXT, header + np.ascontiguousarray(obj).tobytes())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot encode {type(obj)} as msgpack")
+
+def _ext_hook(code: int, data: memoryview, copy: bool = True) -> Any:
+    if code != _NDARRAY_EXT:
+        raise ValueError(f"Unknown msgpack extension code {code}")
+    (dtype_len,) = struct.unpack_from('<B', data)
+    dtype = bytes(data[1:1 + dtype_len]).decode()
+    (ndim,) = struct.unpack_from('<B', data, 1 + dtype_len)
+    shape = struct.unpack_from(f'<{ndim}Q', data, 2 + dtype_len)
+    # Copied out, since reads may hand in a view that is only valid inside the transaction
+    raw = data[2 + dtype_len + 8 * ndim:]
+    return np.frombuffer(bytearray(raw) if copy else raw, dtype=dtype).reshape(shape)
+
+if msgspec is not None:
+    class _MemoryRecord(msgspec.Struct, array_like=True):
+        # Encoded as a positional array in Memory.__slots__ order, so field names are not repeated per entry
+        id: str
+        content: str
+        embedding: Any
+        context: Any
+        metadata: Any
+        update_history: Any
+        timestamp_ns: int
+
+    _msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_enc_hook)
+    _msgpack_decoder = msgspec.msgpack.Decoder(_MemoryRecord, ext_hook=_ext_hook)
+    _msgpack_view_decoder = msgspec.msgpack.Decoder(_MemoryRecord, ext_hook=partial(_ext_hook, copy=False))
 
 class StorageStrategy(ABC):
     @abstractmethod
     def save(self, memory: Memory) -> None:
         pass
 
+    def save_many(self, memories: List[Memory]) -> None:
+        """Save several memories; backends can override this to batch writes"""
+        for memory in memories:
+            self.save(memory)
+
     @abstractmethod
     def load(self, memory_id: str) -> Optional[Memory]:
         pass
 
+    def load_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        """Load several memories, None for missing IDs; backends can override this to share one read"""
+        return [self.load(memory_id) for memory_id in memory_ids]
+
     @abstractmethod
     def update(self, memory_id: str, memory: Memory) -> bool:
         pass
 
+    def update_many(self, memories: List[Memory]) -> List[bool]:
+        """Update several existing memories, returning whether each one existed; backends can override this to batch writes"""
+        return [self.update(memory.id, memory) for memory in memories]
+
     @abstractmethod
     def delete(self, memory_id: str) -> bool:
         pass
 
+    def delete_many(self, memory_ids: List[str]) -> int:
+        """Delete several memories and return how many existed; backends can override this to batch writes"""
+        return sum(1 for memory_id in memory_ids if self.delete(memory_id))
+
+    def delete_where(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                     agent_id: Optional[str] = None) -> int:
+        """Delete every memory matching the given IDs and return how many were deleted"""
+        if not (user_id or session_id or agent_id):
+            raise ValueError("delete_where needs at least one of user_id, session_id or agent_id")
+        return self.delete_many([memory.id for memory in self.list_filtered(user_id, session_id, agent_id)])
+
     @abstractmethod
     def list_all(self) -> List[Memory]:
         pass
 
+    def iter_all(self) -> Iterator[Memory]:
+        """Iterate over all memories; backends can override this to stream from their cursor"""
+        return iter(self.list_all())
+
+    def count(self) -> int:
+        """Number of stored memories; backends can override this to count without decoding"""
+        return sum(1 for _ in self.iter_all())
+
+    def list_filtered(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                      agent_id: Optional[str] = None,
+                      metadata_filters: Optional[List[Tuple[str, str, Any]]] = None) -> List[Memory]:
+        """
+        List memories whose metadata matches every given ID and metadata filter in one pass;
+        backends can override this to use an index
+        """
+        filters = [(key, '==', value) for key, value in
+                   (('user_id', user_id), ('session_id', session_id), ('agent_id', agent_id)) if value]
+        return list(filter(compile_filters(filters + list(metadata_filters or [])), self.iter_all()))
+
     @abstractmethod
     def apply_filters(self, memories: List[Memory], filters: List[tuple]) -> List[Memory]:
         pass
@@ -51,22 +181,156 @@ class StorageStrategy(ABC):
         """Get memories by metadata filters"""
         pass
 
+    def query(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+              agent_id: Optional[str] = None, start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None,
+              metadata_filters: Optional[List[Tuple[str, str, Any]]] = None) -> List[Memory]:
+        """
+        Get the memories matching all given filters in one call, narrowing through the time or
+        ID indices first so metadata_filters only run on the remaining candidates
+        """
+        id_filters = self._with_id_equalities(
+            {key: value for key, value in
+             (('user_id', user_id), ('session_id', session_id), ('agent_id', agent_id)) if value},
+            metadata_filters)
+        if id_filters is None:
+            return []
+        if start_time or end_time:
+            memories = self.find_by_time(start_time or datetime.min, end_time or datetime.max, **id_filters)
+            if metadata_filters:
+                memories = self.apply_filters(memories, metadata_filters)
+            return memories
+        if not id_filters and not metadata_filters:
+            return self.list_all()
+        return self.list_filtered(metadata_filters=metadata_filters, **id_filters)
+
+    def count_filtered(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                       agent_id: Optional[str] = None,
+                       metadata_filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        """Number of memories list_filtered would return; backends can override this to count from an index"""
+        return len(self.list_filtered(user_id, session_id, agent_id, metadata_filters))
+
+    @staticmethod
+    def _with_id_equalities(id_filters: Dict[str, Any],
+                            metadata_filters: Optional[List[Tuple[str, str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Add the (user_id/session_id/agent_id, '==', value) metadata filters to id_filters, so they
+        narrow through the ID indices too; None when one key is asked to equal two values
+        """
+        id_filters = dict(id_filters)
+        for key, op, value in metadata_filters or []:
+            if op == '==' and key in ('user_id', 'session_id', 'agent_id') and isinstance(value, str) and value:
+                if id_filters.setdefault(key, value) != value:
+                    return None
+        return id_filters
+
+    def iter_embeddings(self) -> Iterator[Tuple[str, Any, Dict[str, Any]]]:
+        """Yield (memory_id, embedding, metadata) for every stored memory with an embedding"""
+        for memory in self.iter_all():
+            if memory.embedding is not None:
+                yield memory.id, memory.embedding, memory.metadata
+
 class LMDBStorageStrategy(StorageStrategy):
     METADATA_KEYS = ['user_id', 'session_id', 'agent_id']
+    # Embedding entries: magic, uint32 length of the JSON ID metadata, the JSON, then raw float32
+    EMBEDDING_MAGIC = b'M4E1'
+    # Memory entries: magic, uint32 pickle length, uint32 buffer count, uint64 length per buffer,
+    # the protocol 5 pickle, then its out-of-band buffers (the embedding) stored raw
+    MEMORY_MAGIC = b'M4M5'
+    # Memory entries written with storage.serializer 'msgpack': magic, then the msgpack record
+    MSGPACK_MAGIC = b'M4MP'
+    # Entries written with storage.compress: magic, uint32 zstd dictionary ID, then a zstd frame
+    # holding one of the entry formats above
+    COMPRESSED_MAGIC = b'M4Z1'
+    # Timestamp index keys: big-endian uint64 nanoseconds then the memory ID, so LMDB's key
+    # order is time order and range queries are cursor seeks
+    TIMESTAMP_KEY = struct.Struct('>Q')
 
     def __init__(self):
         self.path: str = config_manager.get('storage.path', './mem4ai_storage')
         self.map_size: int = config_manager.get('storage.map_size', 10 * 1024 * 1024 * 1024)  # 10GB default
+        # Writing through a writable memory map skips a copy per put; map_async also leaves
+        # flushing to the OS, trading durability on power loss for write throughput
+        self.writemap: bool = config_manager.get('storage.writemap', False)
+        self.map_async: bool = config_manager.get('storage.map_async', False)
+        # Read-ahead helps scans of stores that fit in RAM; disable it for random reads of larger stores
+        self.readahead: bool = config_manager.get('storage.readahead', True)
+        self.max_readers: int = config_manager.get('storage.max_readers', 126)
+        # 'safe' syncs data and metadata on every commit. 'fast' writes through the memory map and
+        # leaves flushing to the OS: the database stays consistent, but a system crash (not a
+        # process crash) can lose the most recent commits
+        self.durability: str = config_manager.get('storage.durability', 'safe')
+        if self.durability not in ('safe', 'fast'):
+            raise ValueError(f"Unsupported storage durability: {self.durability}")
+        if self.durability == 'fast':
+            self.writemap = self.map_async = True
+        self.index_map_size: int = config_manager.get('storage.index_map_size', 1024 * 1024 * 1024)
+        # Write the timestamp, metadata and embedding indices from three threads at once; pays off
+        # when commits sync to a slow disk
+        self._index_pool: Optional[ThreadPoolExecutor] = None
+        if config_manager.get('storage.parallel_index_writes', False):
+            self._index_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='mem4ai-index')
+        self.serializer: str = config_manager.get('storage.serializer', 'pickle')
+        if self.serializer not in ('pickle', 'msgpack'):
+            raise ValueError(f"Unsupported storage serializer: {self.serializer}")
+        if self.serializer == 'msgpack' and msgspec is None:
+            raise ImportError("msgspec is not installed. Install it with `pip install mem4ai[msgspec]`")
+        # zstd with a dictionary trained on the first compress_dict_samples entries; entries written
+        # before the dictionary exists are stored uncompressed
+        self.compress: bool = config_manager.get('storage.compress', False)
+        self.compress_level: int = config_manager.get('storage.compress_level', 3)
+        self.compress_dict_samples: int = config_manager.get('storage.compress_dict_samples', 1000)
+        self.compress_dict_size: int = config_manager.get('storage.compress_dict_size', 16 * 1024)
+        if self.compress and zstandard is None:
+            raise ImportError("zstandard is not installed. Install it with `pip install mem4ai[zstd]`")
+        self._zstd_lock = threading.Lock()
+        self._zstd_local = threading.local()  # zstd (de)compressors are not thread safe
+        self._zstd_dicts: Dict[int, Any] = {}
+        self._zstd_dict_id: Optional[int] = None
+        self._zstd_samples: Optional[List[bytes]] = []  # None once a dictionary exists or training failed
+        self._dict_env: Optional[lmdb.Environment] = None
+        # LRU of decoded memories by ID for load/load_many, shared with the other strategies on this
+        # store so any of their writes invalidate it. Other processes' writes do not, so keep it
+        # disabled when they write the same store
+        self.cache_size: int = config_manager.get('storage.cache_size', 0)
+        with _envs_lock:
+            self._cache = _decoded_caches.setdefault(os.path.abspath(self.path), _DecodedCache())
         self._ensure_directory()
         
         # Main environment for storing memories
-        self.env = lmdb.open(self.path, map_size=self.map_size)
+        self.env = self._open(self.path, self.map_size)
         
         # Separate environments for indices
-        self.timestamp_env = lmdb.open(f"{self.path}_timestamp_index", map_size=1024 * 1024 * 1024)
-        self.metadata_env = lmdb.open(f"{self.path}_metadata_index", map_size=1024 * 1024 * 1024)
+        self.timestamp_env = self._open(f"{self.path}_timestamp_index", self.index_map_size, max_dbs=2)
+        self.ts_db = self.timestamp_env.open_db(b'ts')  # timestamp key -> b''
+        self.ts_ids_db = self.timestamp_env.open_db(b'ts_ids')  # memory ID -> its timestamp key
+        self.metadata_env = self._open(f"{self.path}_metadata_index", self.index_map_size, max_dbs=1)
+        # One duplicate per memory ID under each "key:value", kept sorted by LMDB
+        self.meta_db = self.metadata_env.open_db(b'meta', dupsort=True)
+
+        # Embeddings with their ID metadata, so vector indices can be rebuilt without unpickling memories
+        self.embedding_env = self._open(f"{self.path}_embeddings", self.map_size)
         
         self._init_indices()
+        if self.compress:
+            self._load_zstd_dictionary()
+
+    def _open(self, path: str, map_size: int, max_dbs: int = 0) -> lmdb.Environment:
+        # Options only apply when the environment is first opened in this process
+        key = os.path.abspath(path)
+        fast = self.durability == 'fast'
+        options = dict(map_size=map_size, writemap=self.writemap, map_async=self.map_async, sync=not fast,
+                       metasync=not fast, max_dbs=max_dbs, readahead=self.readahead, max_readers=self.max_readers)
+        with _envs_lock:
+            if key not in _envs:
+                _envs[key] = lmdb.open(path, **options), options
+            env, opened = _envs[key]
+        ignored = {name: value for name, value in options.items() if opened[name] != value}
+        if ignored:
+            kept = ", ".join(f"{name}={opened[name]!r}" for name in ignored)
+            print(f"Warning: {key} is already open in this process with {kept}; "
+                  f"ignoring {', '.join(f'{name}={value!r}' for name, value in ignored.items())}")
+        return env
 
     def _ensure_directory(self) -> None:
         if not os.path.exists(self.path):
@@ -74,217 +338,598 @@ class LMDBStorageStrategy(StorageStrategy):
 
     def _init_indices(self) -> None:
         """Initialize index structures if they don't exist"""
+        # Stores created before the sorted timestamp keys kept one pickled dict; rebuild from the memories
         with self.timestamp_env.begin(write=True) as txn:
-            if not txn.get(b'timestamp_index'):
-                txn.put(b'timestamp_index', pickle.dumps({}))
-
+            if txn.get(b'timestamp_index') is not None:
+                txn.delete(b'timestamp_index')
+                cursor = txn.cursor()
+                if cursor.set_range(b'ts:'):
+                    while cursor.key().startswith(b'ts:'):
+                        if not cursor.delete():
+                            break
+                self._update_timestamp_index(list(self.iter_all()), txn)
+
+        # Stores created before the dupsort postings kept a pickled ID set per "key:value"
         with self.metadata_env.begin(write=True) as txn:
-            for key in self.METADATA_KEYS:
-                if not txn.get(key.encode()):
-                    txn.put(key.encode(), pickle.dumps({}))
+            if txn.get(self.METADATA_KEYS[0].encode()) is not None:
+                legacy = [(key, value) for key, value in txn.cursor() if key != b'meta']
+                for key, value in legacy:
+                    txn.delete(key)
+                    if b':' in key:
+                        for memory_id in pickle.loads(value):
+                            txn.put(key, memory_id.encode(), db=self.meta_db)
+
+        # Backfill embeddings for stores created before the embedding index existed
+        if self.embedding_env.stat()['entries'] == 0 and self.env.stat()['entries'] > 0:
+            with self.embedding_env.begin(write=True) as txn:
+                for memory in self.iter_all():
+                    self._update_embedding_index(memory, txn)
 
     def save(self, memory: Memory) -> None:
-        if not isinstance(memory, Memory):
-            raise TypeError(f"Expected Memory object, got {type(memory)}")
-        
+        self.save_many([memory])
+
+    def save_many(self, memories: List[Memory]) -> None:
+        for memory in memories:
+            if not isinstance(memory, Memory):
+                raise TypeError(f"Expected Memory object, got {type(memory)}")
+
+        # One write transaction per environment for the whole batch
+        keys = [memory.id.encode() for memory in memories]
+        previous = {}
         with self.env.begin(write=True) as txn:
-            txn.put(memory.id.encode(), pickle.dumps(memory))
-        
-        # Update indices
-        with self.timestamp_env.begin(write=True) as txn:
-            self._update_timestamp_index(memory, txn)
+            for key, memory in zip(keys, memories):
+                old = txn.replace(key, self._encode_memory(memory))
+                if old is not None:
+                    previous[key] = self._indexed_metadata(old)
+        self._forget(keys)
         
-        with self.metadata_env.begin(write=True) as txn:
-            self._update_metadata_index(memory, txn)
+        self._update_indices(memories, previous)
+
+    def _indexed_metadata(self, value: bytes) -> Dict[str, Any]:
+        # The indexed metadata of an entry about to be overwritten, so its postings can be dropped
+        metadata = self._decode_memory(value, borrow=True).metadata
+        return {key: metadata[key] for key in self.METADATA_KEYS if key in metadata}
+
+    def _update_indices(self, memories: List[Memory],
+                        previous: Optional[Dict[bytes, Dict[str, Any]]] = None) -> None:
+        def timestamps() -> None:
+            with self.timestamp_env.begin(write=True) as txn:
+                self._update_timestamp_index(memories, txn)
+
+        def metadata() -> None:
+            with self.metadata_env.begin(write=True) as txn:
+                self._update_metadata_index(memories, txn, previous)
+
+        def embeddings() -> None:
+            with self.embedding_env.begin(write=True) as txn:
+                for memory in memories:
+                    self._update_embedding_index(memory, txn)
+
+        self._run_index_writes(timestamps, metadata, embeddings)
+
+    def _run_index_writes(self, *writes: Callable[[], None]) -> None:
+        # Each index environment has its own writer lock, so with storage.parallel_index_writes
+        # their transactions (and commit syncs, which release the GIL) overlap
+        if self._index_pool is None:
+            for write in writes:
+                write()
+            return
+        for future in [self._index_pool.submit(write) for write in writes]:
+            future.result()
+
+    def _encode_memory(self, memory: Memory) -> bytes:
+        entry = self._serialize_memory(memory)
+        return self._compress(entry) if self.compress else entry
+
+    def _serialize_memory(self, memory: Memory) -> bytes:
+        embedding = memory.embedding
+        if embedding is not None and not (isinstance(embedding, np.ndarray) and embedding.dtype == np.float32):
+            # Lists of floats pickle at ~9 bytes per element and load back as Python floats;
+            # stored as float32 they take one raw buffer. The caller's memory is left as it was.
+            stored = Memory.__new__(Memory)
+            for name in Memory.__slots__:
+                setattr(stored, name, getattr(memory, name))
+            stored.embedding = np.asarray(embedding, dtype=np.float32)
+            memory = stored
+        # Memories whose metadata or context msgpack cannot round-trip keep the pickle format
+        if self.serializer == 'msgpack' and _msgpack_safe([memory.context, memory.metadata, memory.update_history]):
+            record = _MemoryRecord(*(getattr(memory, name) for name in Memory.__slots__))
+            return self.MSGPACK_MAGIC + _msgpack_encoder.encode(record)
+        if pickle.HIGHEST_PROTOCOL < 5:
+            return pickle.dumps(memory, pickle.HIGHEST_PROTOCOL)
+        buffers = []
+        payload = pickle.dumps(memory, protocol=5, buffer_callback=buffers.append)
+        raw = [buffer.raw() for buffer in buffers]
+        header = self.MEMORY_MAGIC + struct.pack(f'<II{len(raw)}Q', len(payload), len(raw),
+                                                 *(view.nbytes for view in raw))
+        return b''.join([header, payload, *raw])
+
+    def _decode_memory(self, value, borrow: bool = False) -> Memory:
+        """
+        Decode a stored entry. With borrow=True arrays are views of value instead of copies,
+        so the memory is only valid while value is (inside the read transaction).
+        """
+        if value[:4] == self.COMPRESSED_MAGIC:
+            (dict_id,) = struct.unpack_from('<I', value, 4)
+            value = self._zstd_decompressor(dict_id).decompress(value[8:])
+        if value[:4] == self.MSGPACK_MAGIC:
+            if msgspec is None:
+                raise ImportError("msgspec is not installed. Install it with `pip install mem4ai[msgspec]`")
+            record = (_msgpack_view_decoder if borrow else _msgpack_decoder).decode(value[4:])
+            memory = Memory.__new__(Memory)
+            for name in Memory.__slots__:
+                setattr(memory, name, getattr(record, name))
+            return memory
+        if value[:4] != self.MEMORY_MAGIC:
+            # Entries written before the framed format are plain pickles
+            return pickle.loads(value)
+        length, count = struct.unpack_from('<II', value, 4)
+        sizes = struct.unpack_from(f'<{count}Q', value, 12)
+        start = 12 + 8 * count
+        offset = start + length
+        buffers = []
+        for size in sizes:
+            # Copied out, since reads may hand in a view that is only valid inside the transaction
+            buffers.append(value[offset:offset + size] if borrow else bytearray(value[offset:offset + size]))
+            offset += size
+        return pickle.loads(value[start:start + length], buffers=buffers)
+
+    def _compress(self, entry: bytes) -> bytes:
+        if self._zstd_dict_id is None:
+            with self._zstd_lock:
+                if self._zstd_samples is not None and self._zstd_dict_id is None:
+                    self._zstd_samples.append(entry)
+                    if len(self._zstd_samples) >= self.compress_dict_samples:
+                        self._train_zstd_dictionary()
+            if self._zstd_dict_id is None:
+                return entry
+        compressor = getattr(self._zstd_local, 'compressor', None)
+        if compressor is None or self._zstd_local.dict_id != self._zstd_dict_id:
+            compressor = zstandard.ZstdCompressor(level=self.compress_level,
+                                                  dict_data=self._zstd_dicts[self._zstd_dict_id])
+            self._zstd_local.compressor, self._zstd_local.dict_id = compressor, self._zstd_dict_id
+        return self.COMPRESSED_MAGIC + struct.pack('<I', self._zstd_dict_id) + compressor.compress(entry)
+
+    def _zstd_decompressor(self, dict_id: int):
+        if zstandard is None:
+            raise ImportError("zstandard is not installed. Install it with `pip install mem4ai[zstd]`")
+        decompressors = getattr(self._zstd_local, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self._zstd_local.decompressors = {}
+        if dict_id not in decompressors:
+            if dict_id not in self._zstd_dicts:
+                with self._get_dict_env().begin() as txn:
+                    data = txn.get(struct.pack('<I', dict_id))
+                if data is None:
+                    raise ValueError(f"Missing zstd dictionary {dict_id}")
+                self._zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._zstd_dicts[dict_id])
+        return decompressors[dict_id]
+
+    def _get_dict_env(self) -> lmdb.Environment:
+        if self._dict_env is None:
+            self._dict_env = self._open(f"{self.path}_zstd_dicts", 64 * 1024 * 1024)
+        return self._dict_env
+
+    def _load_zstd_dictionary(self) -> None:
+        # Reuse the dictionary trained earlier, or by another process, for this store
+        with self._get_dict_env().begin() as txn:
+            cursor = txn.cursor()
+            if cursor.first():
+                (dict_id,) = struct.unpack('<I', cursor.key())
+                self._zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(cursor.value())
+                self._zstd_dict_id = dict_id
+                self._zstd_samples = None
+
+    def _train_zstd_dictionary(self) -> None:
+        samples, self._zstd_samples = self._zstd_samples, None
+        try:
+            dictionary = zstandard.train_dictionary(self.compress_dict_size, samples)
+        except zstandard.ZstdError as e:
+            print(f"Error training zstd dictionary, memories are stored uncompressed: {e}")
+            return
+        with self._get_dict_env().begin(write=True) as txn:
+            existing = txn.cursor()
+            if existing.first():
+                # Another process trained one first
+                (dict_id,) = struct.unpack('<I', existing.key())
+                self._zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(existing.value())
+            else:
+                dict_id = dictionary.dict_id()
+                txn.put(struct.pack('<I', dict_id), dictionary.as_bytes())
+                self._zstd_dicts[dict_id] = dictionary
+        self._zstd_dict_id = dict_id
 
     def load(self, memory_id: str) -> Optional[Memory]:
         if not isinstance(memory_id, str):
             raise TypeError(f"Expected string for memory_id, got {type(memory_id)}")
         
-        with self.env.begin() as txn:
-            data = txn.get(memory_id.encode())
-            if data is None:
-                return None
-            return pickle.loads(data)
+        return self.load_many([memory_id])[0]
+
+    def load_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        # One read transaction for the whole batch, e.g. the top-k hits of a search
+        keys = [memory_id.encode() for memory_id in memory_ids]
+        found = {}
+        if self.cache_size > 0:
+            with self._cache.lock:
+                for key in keys:
+                    memory = self._cache.entries.get(key)
+                    if memory is not None:
+                        self._cache.entries.move_to_end(key)
+                        found[key] = memory
+                # Read before the transaction starts: a write committed after that bumps it, so a
+                # result decoded from an older snapshot is not cached
+                generation = self._cache.generation
+        missing = [key for key in keys if key not in found]
+        if missing:
+            with self.env.begin(buffers=True) as txn:
+                decoded = self._get_sorted(txn, missing)
+            found.update(decoded)
+            if self.cache_size > 0 and decoded:
+                with self._cache.lock:
+                    if generation == self._cache.generation:
+                        self._cache.entries.update(decoded)
+                        while len(self._cache.entries) > self.cache_size:
+                            self._cache.entries.popitem(last=False)
+        # Callers own what they load, so cached memories are handed out as copies
+        return [self._copy(found[key]) if self.cache_size > 0 and key in found else found.get(key)
+                for key in keys]
+
+    @staticmethod
+    def _copy(memory: Memory) -> Memory:
+        # Top-level metadata, context and history are copied; nested values and the embedding are shared
+        copy = Memory.__new__(Memory)
+        for name in Memory.__slots__:
+            setattr(copy, name, getattr(memory, name))
+        copy.metadata = dict(memory.metadata)
+        copy.context = dict(memory.context)
+        copy.update_history = list(memory.update_history)
+        return copy
+
+    def _forget(self, keys: Optional[List[bytes]] = None) -> None:
+        # Called after the write commits; None drops every cached memory. Runs even with this
+        # strategy's cache disabled, since another strategy on the store may have it enabled
+        with self._cache.lock:
+            self._cache.generation += 1
+            if keys is None:
+                self._cache.entries.clear()
+            for key in keys or []:
+                self._cache.entries.pop(key, None)
+
+    def _get_sorted(self, txn, keys: List[bytes]) -> Dict[bytes, Memory]:
+        # Reading in key order walks the B+tree pages sequentially instead of jumping between them
+        found = {}
+        for key in sorted(set(keys)):
+            data = txn.get(key)
+            if data is not None:
+                found[key] = self._decode_memory(data)
+        return found
 
     def update(self, memory_id: str, memory: Memory) -> bool:
-        if not isinstance(memory_id, str) or not isinstance(memory, Memory):
+        # update_many checks memory
+        if not isinstance(memory_id, str):
             raise TypeError("Invalid types for update operation")
-        
+
+        return self.update_many([memory])[0]
+
+    def update_many(self, memories: List[Memory]) -> List[bool]:
+        for memory in memories:
+            if not isinstance(memory, Memory):
+                raise TypeError(f"Expected Memory object, got {type(memory)}")
+
+        # Only memories that already exist are written, all in one transaction
+        updated = []
+        previous = {}
         with self.env.begin(write=True) as txn:
-            if txn.get(memory_id.encode()) is None:
-                return False
-            txn.put(memory_id.encode(), pickle.dumps(memory))
-            
-            # Update indices
-            with self.timestamp_env.begin(write=True) as ts_txn:
-                self._update_timestamp_index(memory, ts_txn)
-            
-            with self.metadata_env.begin(write=True) as meta_txn:
-                self._update_metadata_index(memory, meta_txn)
-            
-            return True
+            for memory in memories:
+                key = memory.id.encode()
+                old = txn.get(key)
+                exists = old is not None
+                if exists:
+                    previous[key] = self._indexed_metadata(old)
+                    txn.put(key, self._encode_memory(memory))
+                updated.append(exists)
+        self._forget([memory.id.encode() for memory, exists in zip(memories, updated) if exists])
+
+        existing = [memory for memory, exists in zip(memories, updated) if exists]
+        if existing:
+            self._update_indices(existing, previous)
+
+        return updated
 
     def delete(self, memory_id: str) -> bool:
         if not isinstance(memory_id, str):
             raise TypeError(f"Expected string for memory_id, got {type(memory_id)}")
         
-        memory = self.load(memory_id)
-        if not memory:
-            return False
-        
-        # Remove from main storage and indices
+        return self.delete_many([memory_id]) == 1
+
+    def delete_many(self, memory_ids: List[str]) -> int:
+        # Remove from main storage in one transaction, then from indices
+        memories = []
         with self.env.begin(write=True) as txn:
-            txn.delete(memory_id.encode())
-        
-        self._remove_from_indices(memory)
-        return True
+            for memory_id in memory_ids:
+                data = txn.pop(memory_id.encode())
+                if data is not None:
+                    memories.append(self._decode_memory(data))
+        self._forget([memory_id.encode() for memory_id in memory_ids])
+
+        if memories:
+            self._remove_from_indices(memories)
+        return len(memories)
+
+    def count(self) -> int:
+        return self.env.stat()['entries']
 
     def list_all(self) -> List[Memory]:
+        # One snapshot, and the transaction closes as soon as the list is built
+        with self.env.begin(buffers=True) as txn:
+            return [self._decode_memory(value) for value in txn.cursor().iternext(keys=False)]
+
+    def iter_all(self) -> Iterator[Memory]:
+        return self._scan(self.env, lambda key, value: self._decode_memory(value), buffers=True)
+
+    def _scan(self, env: lmdb.Environment, decode: Callable[[Any, Any], Any], buffers: bool = False,
+              block_size: int = 1024) -> Iterator[Any]:
+        """
+        Decode every entry of env, block_size at a time in short read transactions, so a slow
+        consumer does not keep a reader open (and LMDB from reusing freed pages) for the whole
+        scan. Entries written during the scan may or may not be seen.
+        """
+        last = None
+        while True:
+            with env.begin(buffers=buffers) as txn:
+                cursor = txn.cursor()
+                positioned = cursor.first() if last is None else cursor.set_range(last)
+                if positioned and last is not None and cursor.key() == last:
+                    positioned = cursor.next()
+                block = []
+                while positioned and len(block) < block_size:
+                    block.append(decode(cursor.key(), cursor.value()))
+                    last = bytes(cursor.key())
+                    positioned = cursor.next()
+            yield from block
+            if not positioned:
+                return
+
+    def list_filtered(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                      agent_id: Optional[str] = None,
+                      metadata_filters: Optional[List[Tuple[str, str, Any]]] = None) -> List[Memory]:
+        id_filters = self._with_id_equalities(
+            {key: value for key, value in
+             (('user_id', user_id), ('session_id', session_id), ('agent_id', agent_id)) if value},
+            metadata_filters)
+        if id_filters is None:
+            return []
+        if not id_filters:
+            predicate = compile_filters(list(metadata_filters or []))
+            matches = self._scan(self.env, lambda key, value: self._decode_matching(value, predicate), buffers=True)
+            return [memory for memory in matches if memory is not None]
+
+        # Intersect the metadata index postings, then load only the matching memories
+        memory_ids = self._matching_ids(id_filters)
+
+        # Postings can outlive a metadata change, so the IDs are confirmed against the memory
+        # itself, in the same pass as the metadata filters
+        predicate = compile_filters([(key, '==', value) for key, value in id_filters.items()] +
+                                    list(metadata_filters or []))
         memories = []
-        with self.env.begin() as txn:
-            cursor = txn.cursor()
-            for _, value in cursor:
-                memories.append(pickle.loads(value))
+        with self.env.begin(buffers=True) as txn:
+            for memory_id in sorted(memory_ids):
+                data = txn.get(memory_id.encode())
+                if data is not None:
+                    memory = self._decode_matching(data, predicate)
+                    if memory is not None:
+                        memories.append(memory)
         return memories
 
+    def count_filtered(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                       agent_id: Optional[str] = None,
+                       metadata_filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        id_filters = self._with_id_equalities(
+            {key: value for key, value in
+             (('user_id', user_id), ('session_id', session_id), ('agent_id', agent_id)) if value},
+            metadata_filters)
+        if id_filters is None:
+            return 0
+        id_only = all(op == '==' and key in self.METADATA_KEYS and isinstance(value, str) and value
+                      for key, op, value in metadata_filters or [])
+        if not id_filters or not id_only:
+            return len(self.list_filtered(user_id, session_id, agent_id, metadata_filters))
+        # Postings are dropped on update and delete, so pure ID filters count without decoding
+        return len(self._matching_ids(id_filters))
+
+    def _decode_matching(self, value, predicate: Callable[[Memory], bool]) -> Optional[Memory]:
+        # Filters run on a borrowed decode, so entries they reject never copy their embedding
+        # out of the transaction; the few that pass are decoded again for the caller
+        if not predicate(self._decode_memory(value, borrow=True)):
+            return None
+        return self._decode_memory(value)
+
     def apply_filters(self, memories: List[Memory], filters: List[tuple]) -> List[Memory]:
         if not isinstance(memories, list) or not isinstance(filters, list):
             raise TypeError("Invalid types for apply_filters operation")
         
-        def passes_filter(memory: Memory, filter_tuple: tuple) -> bool:
-            key, op, value = filter_tuple
-            if key not in memory.metadata:
-                return False
-            mem_value = memory.metadata[key]
-            if op == '==':
-                return mem_value == value
-            elif op == '!=':
-                return mem_value != value
-            elif op == '>':
-                return mem_value > value
-            elif op == '>=':
-                return mem_value >= value
-            elif op == '<':
-                return mem_value < value
-            elif op == '<=':
-                return mem_value <= value
-            else:
-                raise ValueError(f"Unknown operator: {op}")
-
-        return [mem for mem in memories if all(passes_filter(mem, f) for f in filters)]
+        return list(filter(compile_filters(filters), memories))
 
     def clear_all(self) -> None:
         with self.env.begin(write=True) as txn:
             txn.drop(self.env.open_db())
+        self._forget()
         
         with self.timestamp_env.begin(write=True) as txn:
-            txn.drop(self.timestamp_env.open_db())
+            txn.drop(self.ts_db, delete=False)
+            txn.drop(self.ts_ids_db, delete=False)
         
         with self.metadata_env.begin(write=True) as txn:
-            txn.drop(self.metadata_env.open_db())
-        
-        self._init_indices()
+            txn.drop(self.meta_db, delete=False)
 
-    def _update_timestamp_index(self, memory: Memory, txn) -> None:
-        timestamp_key = memory.timestamp.isoformat().encode()
-        txn.put(f"ts:{memory.id}".encode(), timestamp_key)
+        with self.embedding_env.begin(write=True) as txn:
+            txn.drop(self.embedding_env.open_db())
         
-        index = pickle.loads(txn.get(b'timestamp_index') or pickle.dumps({}))
-        if timestamp_key not in index:
-            index[timestamp_key] = set()
-        index[timestamp_key].add(memory.id)
-        txn.put(b'timestamp_index', pickle.dumps(index))
-
-    def _update_metadata_index(self, memory: Memory, txn) -> None:
-        for key in self.METADATA_KEYS:
-            if key in memory.metadata:
-                value = memory.metadata[key]
-                index_key = f"{key}:{value}".encode()
-                index = pickle.loads(txn.get(index_key) or pickle.dumps(set()))
-                index.add(memory.id)
-                txn.put(index_key, pickle.dumps(index))
+        self._init_indices()
 
-    def _remove_from_indices(self, memory: Memory) -> None:
-        # Remove from timestamp index
-        with self.timestamp_env.begin(write=True) as txn:
-            index = pickle.loads(txn.get(b'timestamp_index'))
-            timestamp_key = memory.timestamp.isoformat().encode()
-            if timestamp_key in index:
-                index[timestamp_key].discard(memory.id)
-                if not index[timestamp_key]:
-                    del index[timestamp_key]
-            txn.put(b'timestamp_index', pickle.dumps(index))
-        
-        # Remove from metadata indices
-        with self.metadata_env.begin(write=True) as txn:
+    def _timestamp_key(self, timestamp_ns: int, id_key: bytes = b'') -> bytes:
+        return self.TIMESTAMP_KEY.pack(min(max(timestamp_ns, 0), 2 ** 64 - 1)) + id_key
+
+    @staticmethod
+    def _to_ns(value: datetime) -> int:
+        # datetime.min and datetime.max fall outside the local-time conversion range
+        try:
+            return datetime_to_ns(value)
+        except (OverflowError, ValueError, OSError):
+            return 0 if value.year < 1970 else 2 ** 64 - 1
+
+    def _update_timestamp_index(self, memories: List[Memory], txn) -> None:
+        for memory in memories:
+            id_key = memory.id.encode()
+            timestamp_key = self._timestamp_key(memory.timestamp_ns, id_key)
+            # An updated memory moves from its previous timestamp
+            previous = txn.get(id_key, db=self.ts_ids_db)
+            if previous is not None and previous != timestamp_key:
+                txn.delete(previous, db=self.ts_db)
+            txn.put(timestamp_key, b'', db=self.ts_db)
+            txn.put(id_key, timestamp_key, db=self.ts_ids_db)
+
+    def _update_metadata_index(self, memories: List[Memory], txn,
+                               previous: Optional[Dict[bytes, Dict[str, Any]]] = None) -> None:
+        for memory in memories:
+            id_key = memory.id.encode()
+            old = previous.get(id_key, {}) if previous else {}
             for key in self.METADATA_KEYS:
-                if key in memory.metadata:
-                    index_key = f"{key}:{memory.metadata[key]}".encode()
-                    index = pickle.loads(txn.get(index_key) or pickle.dumps(set()))
-                    index.discard(memory.id)
-                    if index:
-                        txn.put(index_key, pickle.dumps(index))
-                    else:
-                        txn.delete(index_key)
+                posting = f"{key}:{memory.metadata[key]}".encode() if key in memory.metadata else None
+                # An updated memory leaves the postings of values it no longer has
+                if key in old:
+                    old_posting = f"{key}:{old[key]}".encode()
+                    if old_posting != posting:
+                        txn.delete(old_posting, id_key, db=self.meta_db)
+                if posting is not None:
+                    txn.put(posting, id_key, db=self.meta_db)
+
+    def _update_embedding_index(self, memory: Memory, txn) -> None:
+        id_key = memory.id.encode()
+        if memory.embedding is None:
+            txn.delete(id_key)
+            return
+        metadata = json.dumps({key: memory.metadata[key] for key in self.METADATA_KEYS
+                               if key in memory.metadata}, separators=(',', ':')).encode()
+        embedding = np.asarray(memory.embedding, dtype=np.float32).reshape(-1)
+        txn.put(id_key, self.EMBEDDING_MAGIC + struct.pack('<I', len(metadata)) + metadata + embedding.tobytes())
+
+    def _decode_embedding_entry(self, value: bytes) -> Tuple[Dict[str, Any], np.ndarray]:
+        if not value.startswith(self.EMBEDDING_MAGIC):
+            # Entries written before the raw format were pickled (metadata, embedding) tuples
+            return pickle.loads(value)
+        start = len(self.EMBEDDING_MAGIC) + 4
+        (length,) = struct.unpack_from('<I', value, len(self.EMBEDDING_MAGIC))
+        metadata = json.loads(value[start:start + length])
+        return metadata, np.frombuffer(value, dtype=np.float32, offset=start + length)
+
+    def iter_embeddings(self) -> Iterator[Tuple[str, Any, Dict[str, Any]]]:
+        def decode(key: bytes, value: bytes) -> Tuple[str, Any, Dict[str, Any]]:
+            metadata, embedding = self._decode_embedding_entry(value)
+            return key.decode(), embedding, metadata
+
+        # Values are copied out (buffers=False), since the embeddings are views of them
+        return self._scan(self.embedding_env, decode)
+
+    def _remove_from_indices(self, memories: List[Memory]) -> None:
+        def embeddings() -> None:
+            with self.embedding_env.begin(write=True) as txn:
+                for memory in memories:
+                    txn.delete(memory.id.encode())
+
+        def timestamps() -> None:
+            with self.timestamp_env.begin(write=True) as txn:
+                for memory in memories:
+                    timestamp_key = txn.pop(memory.id.encode(), db=self.ts_ids_db)
+                    if timestamp_key is not None:
+                        txn.delete(timestamp_key, db=self.ts_db)
+
+        def metadata() -> None:
+            with self.metadata_env.begin(write=True) as txn:
+                for memory in memories:
+                    id_key = memory.id.encode()
+                    for key in self.METADATA_KEYS:
+                        if key in memory.metadata:
+                            txn.delete(f"{key}:{memory.metadata[key]}".encode(), id_key, db=self.meta_db)
+
+        self._run_index_writes(embeddings, timestamps, metadata)
 
     def find_recent(self, limit: int, **kwargs) -> List[Memory]:
-        memories = []
         metadata_filters = {k: v for k, v in kwargs.items() 
                           if k in self.METADATA_KEYS and v is not None}
-        
-        with self.timestamp_env.begin() as ts_txn:
-            index = pickle.loads(ts_txn.get(b'timestamp_index'))
-            sorted_timestamps = sorted(index.keys(), reverse=True)
-            
-            with self.env.begin() as mem_txn:
-                for ts_key in sorted_timestamps:
-                    memory_ids = index[ts_key]
-                    if metadata_filters:
-                        memory_ids = self._filter_by_metadata(memory_ids, metadata_filters)
-                    
-                    for memory_id in memory_ids:
-                        memory = pickle.loads(mem_txn.get(memory_id.encode()))
-                        if memory:
-                            memories.append(memory)
-                            if len(memories) >= limit:
-                                return memories[:limit]
+        allowed = self._allowed_keys(metadata_filters)
+        if limit <= 0 or allowed is not None and not allowed:
+            return []
+
+        # Walk the timestamp keys newest first, fetching limit memories at a time until enough are found
+        memories = []
+        with self.timestamp_env.begin() as ts_txn, self.env.begin(buffers=True) as mem_txn:
+            cursor = ts_txn.cursor(db=self.ts_db)
+            if not cursor.last():
+                return memories
+            keys = (ts_key[self.TIMESTAMP_KEY.size:] for ts_key in cursor.iterprev(values=False))
+            if allowed is not None:
+                keys = (key for key in keys if key in allowed)
+            while len(memories) < limit:
+                chunk = list(islice(keys, limit - len(memories)))
+                if not chunk:
+                    break
+                found = self._get_sorted(mem_txn, chunk)
+                memories.extend(found[key] for key in chunk if key in found)
         return memories
 
     def find_by_time(self, start_time: datetime, end_time: datetime, **kwargs) -> List[Memory]:
-        memories = []
-        start_key = start_time.isoformat().encode()
-        end_key = end_time.isoformat().encode()
+        # Memory timestamps have microsecond resolution, so the end bound covers its whole microsecond
+        start_key = self._timestamp_key(self._to_ns(start_time))
+        # UTF-8 IDs never contain 0xff, so every key of the end timestamp sorts below this bound
+        end_key = self._timestamp_key(self._to_ns(end_time) + 999) + b'\xff'
         metadata_filters = {k: v for k, v in kwargs.items() 
                           if k in self.METADATA_KEYS and v is not None}
-        
-        with self.timestamp_env.begin() as ts_txn:
-            index = pickle.loads(ts_txn.get(b'timestamp_index'))
-            
-            with self.env.begin() as mem_txn:
-                for ts_key in index:
-                    if start_key <= ts_key <= end_key:
-                        memory_ids = index[ts_key]
-                        if metadata_filters:
-                            memory_ids = self._filter_by_metadata(memory_ids, metadata_filters)
-                        
-                        for memory_id in memory_ids:
-                            memory = pickle.loads(mem_txn.get(memory_id.encode()))
-                            if memory:
-                                memories.append(memory)
-        
-        return sorted(memories, key=lambda x: x.timestamp)
+        allowed = self._allowed_keys(metadata_filters)
+        if allowed is not None and not allowed:
+            return []
 
-    def _filter_by_metadata(self, memory_ids: set, metadata_filters: Dict[str, Any]) -> set:
-        result_ids = memory_ids
-        for key, value in metadata_filters.items():
-            with self.metadata_env.begin() as txn:
+        # Keys come back in time order, so no sort is needed
+        keys = []
+        with self.timestamp_env.begin() as ts_txn:
+            cursor = ts_txn.cursor(db=self.ts_db)
+            if cursor.set_range(start_key):
+                for ts_key in cursor.iternext(values=False):
+                    if ts_key > end_key:
+                        break
+                    memory_id = ts_key[self.TIMESTAMP_KEY.size:]
+                    if allowed is None or memory_id in allowed:
+                        keys.append(memory_id)
+        if not keys:
+            return []
+        with self.env.begin(buffers=True) as mem_txn:
+            found = self._get_sorted(mem_txn, keys)
+        return [found[key] for key in keys if key in found]
+
+    def _allowed_keys(self, metadata_filters: Dict[str, Any]) -> Optional[set]:
+        # Encoded IDs, compared with the ID part of timestamp keys without decoding them; None when unfiltered
+        if not metadata_filters:
+            return None
+        return {memory_id.encode() for memory_id in self._matching_ids(metadata_filters)}
+
+    def _matching_ids(self, metadata_filters: Dict[str, Any]) -> set:
+        """IDs in the metadata index postings of every (key, value) pair"""
+        items = iter(metadata_filters.items())
+        key, value = next(items)
+        with self.metadata_env.begin() as txn:
+            cursor = txn.cursor(db=self.meta_db)
+            if not cursor.set_key(f"{key}:{value}".encode()):
+                return set()
+            memory_ids = {memory_id.decode() for memory_id in cursor.iternext_dup()}
+            # Later postings are probed per remaining ID rather than read in full
+            for key, value in items:
                 index_key = f"{key}:{value}".encode()
-                current_ids = pickle.loads(txn.get(index_key) or pickle.dumps(set()))
-                result_ids = result_ids.intersection(current_ids)
-                if not result_ids:  # Short circuit if no matches
+                memory_ids = {memory_id for memory_id in memory_ids
+                              if cursor.set_key_dup(index_key, memory_id.encode())}
+                if not memory_ids:  # Short circuit if no matches
                     break
-        return result_ids
+        return memory_ids
 
     def find_by_meta(self, metadata_filters: Dict[str, Any]) -> List[Memory]:
         valid_filters = {k: v for k, v in metadata_filters.items() 
@@ -293,21 +938,11 @@ class LMDBStorageStrategy(StorageStrategy):
         if not valid_filters:
             return []
 
-        key, value = next(iter(valid_filters.items()))
-        with self.metadata_env.begin() as meta_txn:
-            memory_ids = pickle.loads(meta_txn.get(f"{key}:{value}".encode()) or pickle.dumps(set()))
-
-        if len(valid_filters) > 1:
-            memory_ids = self._filter_by_metadata(memory_ids, valid_filters)
-
-        memories = []
-        with self.env.begin() as mem_txn:
-            for memory_id in memory_ids:
-                memory_data = mem_txn.get(memory_id.encode())
-                if memory_data:
-                    memories.append(pickle.loads(memory_data))
+        memory_ids = self._matching_ids(valid_filters)
+        with self.env.begin(buffers=True) as mem_txn:
+            memories = list(self._get_sorted(mem_txn, [memory_id.encode() for memory_id in memory_ids]).values())
 
-        return sorted(memories, key=lambda x: x.timestamp, reverse=True)
+        return sorted(memories, key=lambda x: x.timestamp_ns, reverse=True)
     
     
 def get_storage_strategy() -> StorageStrategy:
@@ -1,23 +1,57 @@
+import copy
 import os
-import yaml
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Optional
 
 class ConfigManager:
     DEFAULT_CONFIG = {
         'embedding': {
             'model': 'text-embedding-3-small',
             'dimension': 768,
+            'cache_size': 1024,  # LRU entries for repeated texts, 0 disables the cache
+            'query_cache_size': 1024,  # LRU entries reserved for search queries, 0 disables it
+            'batch_size': 256,   # Texts per embedding request in embed_batch
+            'max_concurrency': 4,  # Embedding requests in flight at once for large batches
+            'cache_path': None,  # SQLite file persisting embeddings across runs, None keeps them in memory only
+            'fuzzy_cache': False,  # Reuse the embedding of a near-duplicate cached text (SimHash + edit ratio)
+            'fuzzy_max_distance': 3,  # Max differing SimHash bits for a fuzzy hit
+            'fuzzy_min_similarity': 0.95,  # Min character similarity ratio for a fuzzy hit
         },
         'storage': {
             'type': 'lmdb',
             'path': './memtor_storage',
+            'writemap': False,  # Write LMDB pages through a writable memory map
+            'map_async': False,  # With writemap, let the OS flush pages asynchronously (faster, less durable)
+            'readahead': True,  # OS read-ahead on the LMDB files; disable for random reads of stores larger than RAM
+            'max_readers': 126,  # Concurrent LMDB read transactions (threads and processes) allowed
+            'durability': 'safe',  # 'safe' syncs every commit; 'fast' implies writemap and map_async and skips syncs (a system crash can lose recent commits)
+            'index_map_size': 1024 * 1024 * 1024,  # Map size of the timestamp and metadata index environments
+            'parallel_index_writes': False,  # Commit the timestamp, metadata and embedding indices concurrently
+            'cache_size': 0,  # Decoded memories kept in an LRU for get/search hits; only safe when this process is the sole writer
+            'compress': False,  # zstd-compress memory entries (requires zstandard) with a dictionary trained on the store's first entries
+            'compress_level': 3,  # zstd compression level
+            'compress_dict_samples': 1000,  # Entries sampled to train the dictionary; earlier entries stay uncompressed
+            'compress_dict_size': 16 * 1024,  # Bytes of the trained dictionary
+            'serializer': 'pickle',  # 'pickle' or 'msgpack' (requires msgspec) for memory entries; both formats stay readable
         },
         'search': {
             'algorithm': 'cosine_bm25',
+            'strategy': 'default',  # 'default' (cosine + BM25 rerank) or 'numba' (compiled parallel cosine)
             'top_k': 10,
+            'index': 'numpy',  # 'numpy', 'faiss' (requires faiss-cpu), 'hnsw' (requires hnswlib) or None to scan storage
+            'index_capacity': 1024,  # Initial rows of the numpy embedding matrix
+            'index_dtype': 'float32',  # 'float32' keeps full precision; opt into 'float16' to halve index memory or 'int8' to quarter it (approximate, reranked)
+            'index_tile_rows': 1024,   # Rows scored per tile by the numpy index
+            'index_filter_keys': [],  # Extra metadata keys the numpy index keeps as columns, so (key, op, value) filters on them are vectorized
+            'hnsw_m': 16,  # Graph degree of the hnsw index
+            'hnsw_ef_construction': 200,  # Build-time candidate list size of the hnsw index
+            'hnsw_ef': 64,  # Query-time candidate list size of the hnsw index (raised to k when smaller)
+            'bm25_index': False,  # Keep a corpus-wide BM25 index for reranking instead of refitting on the candidates per query
+            'oversample': 4,   # Index candidates fetched per result before metadata filtering
         },
         'memory': {
             'max_history': 5,
+            'max_failed_background': 1000,  # Failed add_memory_background errors kept for wait_for/background_failures; the oldest are dropped beyond this
         },
         'extraction': {
             'enabled': True,  # Whether to use knowledge extraction
@@ -25,20 +59,31 @@ class ConfigManager:
             'model': 'gpt-4o-mini', # Model for LLM-based strategies
             'store_full_response': True,
             'extraction_timeout': 30,
-            'retries': 2,
+            'retries': 2,  # Re-prompts with the validation error when a response does not match the schema
+            'retry_backoff': 1.0,  # Seconds to wait before retry n is n * retry_backoff
+            'max_workers': 4,  # Threads running extraction alongside embedding
+            'cancel_similarity': None,  # Reuse the context of a stored memory at least this similar instead of extracting; adds then probe the index before extracting instead of alongside embedding
+            'cache_size': 1024,  # In-memory LRU of extraction results keyed by model, prompt and messages
+            'cache_path': None,  # LMDB directory persisting extraction results, None keeps them in memory only
+            'max_concurrency': 8,  # Extraction requests in flight at once in batch extraction
         }
     }
 
     def __init__(self, config_path: str = None):
         self.config_path = config_path or os.path.expanduser('~/.mem4ai/config.yaml')
         self.config = self.load_config()
+        # Dotted key -> value, so get() is a single dict lookup; rebuilt by set()
+        self._flat = self._flatten(self.config)
 
     def load_config(self) -> Dict[str, Any]:
         if os.path.exists(self.config_path):
+            import yaml  # Only needed when there is a config file to read
             with open(self.config_path, 'r') as f:
-                user_config = yaml.safe_load(f)
-            return self.merge_configs(self.DEFAULT_CONFIG, user_config)
-        return self.DEFAULT_CONFIG.copy()
+                # libyaml's C loader when PyYAML was built with it; an empty file loads as None
+                user_config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+            return self.merge_configs(copy.deepcopy(self.DEFAULT_CONFIG), user_config)
+        # A deep copy, so set() on one manager neither edits the defaults nor leaves another manager's _flat stale
+        return copy.deepcopy(self.DEFAULT_CONFIG)
 
     def merge_configs(self, default: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
         for key, value in user.items():
@@ -48,19 +93,64 @@ class ConfigManager:
                 default[key] = value
         return default
 
+    def _flatten(self, config: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+        flat = {}
+        for key, value in config.items():
+            flat[prefix + key] = value
+            if isinstance(value, dict):
+                flat.update(self._flatten(value, f"{prefix}{key}."))
+        return flat
+
     def get(self, key: str, default: Any = None) -> Any:
-        keys = key.split('.')
-        value = self.config
-        for k in keys:
-            if k in value:
-                value = value[k]
-            else:
-                return default
-        return value
+        return self._flat.get(key, default)
+
+    def fingerprint(self, *sections: str) -> str:
+        """Hashable snapshot of the given top-level sections, for caching objects built from them."""
+        return repr(sorted((key, repr(value)) for key, value in self._flat.items()
+                           if key.split('.', 1)[0] in sections and not isinstance(value, dict)))
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a dotted config key at runtime. Use this rather than editing `config` directly."""
+        *sections, name = key.split('.')
+        target = self.config
+        for section in sections:
+            target = target.setdefault(section, {})
+        target[name] = value
+        self._flat = self._flatten(self.config)
 
     def save(self):
+        import yaml
         os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
         with open(self.config_path, 'w') as f:
-            yaml.dump(self.config, f)
+            yaml.dump(self.config, f, Dumper=getattr(yaml, 'CDumper', yaml.Dumper))
+
+class _LazyConfigManager:
+    """
+    Stands in for the shared ConfigManager, which is only created (and the config file read)
+    the first time any of its attributes is used, so importing mem4ai does no file or YAML work.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _manager(self) -> ConfigManager:
+        instance: Optional[ConfigManager] = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, '_instance', ConfigManager())
+                instance = self._instance
+        return instance
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Spelled out since it is by far the most frequent call
+        return self._manager().get(key, default)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._manager(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._manager(), name, value)
 
-config_manager = ConfigManager()
\ No newline at end of file
+config_manager = _LazyConfigManager()
\ No newline at end of file
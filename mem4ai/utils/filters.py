@@ -0,0 +1,69 @@
+from functools import lru_cache
+import operator
+from typing import Any, Callable, Iterable, List, Tuple
+import numpy as np
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+# Element-wise counterparts of OPERATORS, comparing a whole column of metadata values at once
+ARRAY_OPERATORS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+_MISSING = object()
+
+def _compile(filters: Tuple[Tuple[str, str, Any], ...]) -> Callable[[Any], bool]:
+    compiled = []
+    for key, op, value in filters:
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator: {op}")
+        compiled.append((key, OPERATORS[op], value))
+    # Equalities usually reject the most memories and never raise, so they are checked first;
+    # the sort is stable, so other conditions keep their given order
+    compiled.sort(key=lambda condition: condition[1] is not operator.eq)
+
+    def predicate(memory) -> bool:
+        metadata = memory.metadata
+        for key, compare, value in compiled:
+            found = metadata.get(key, _MISSING)
+            if found is _MISSING or not compare(found, value):
+                return False
+        return True
+
+    return predicate
+
+@lru_cache(maxsize=256)
+def _compile_cached(filters: Tuple[Tuple[str, str, Any], ...]) -> Callable[[Any], bool]:
+    return _compile(filters)
+
+def compile_filters(filters: List[Tuple[str, str, Any]]) -> Callable[[Any], bool]:
+    """
+    Turn (key, op, value) metadata filters into one predicate over memories.
+
+    Operators are resolved once here rather than per memory; a memory passes when
+    every filtered key is present in its metadata and every comparison holds.
+    Predicates are cached per filter list, so repeated searches reuse them.
+    """
+    filters = tuple(tuple(condition) for condition in filters)
+    try:
+        return _compile_cached(filters)
+    except TypeError:
+        # Unhashable filter values (lists, dicts) are compiled each time
+        return _compile(filters)
+
+def apply_metadata_filters(memories: Iterable, filters: List[Tuple[str, str, Any]]) -> List:
+    if not filters:
+        return memories if isinstance(memories, list) else list(memories)
+    return list(filter(compile_filters(filters), memories))
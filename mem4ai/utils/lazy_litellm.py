@@ -0,0 +1,33 @@
+"""
+Thin wrappers around litellm that import it on first use.
+
+Importing litellm loads every provider SDK and takes seconds, which users relying on
+local embeddings or storage alone should not pay when importing mem4ai.
+"""
+from functools import lru_cache
+import copy
+
+def completion(**kwargs):
+    import litellm
+    return litellm.completion(**kwargs)
+
+async def acompletion(**kwargs):
+    import litellm
+    return await litellm.acompletion(**kwargs)
+
+def embedding(**kwargs):
+    import litellm
+    return litellm.embedding(**kwargs)
+
+@lru_cache(maxsize=None)
+def _response_format(model) -> dict:
+    from litellm.utils import type_to_response_format_param
+    return type_to_response_format_param(model)
+
+def response_format(model) -> dict:
+    """
+    JSON-schema response_format for a pydantic model. litellm would regenerate the
+    schema from the class on every call; here it is built once per model, and each
+    caller gets its own copy in case the request is modified downstream.
+    """
+    return copy.deepcopy(_response_format(model))
@@ -0,0 +1,69 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+if numba is not None:
+    # cache=True keeps the compiled kernel on disk, so only the first process pays for JIT
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_scores_jit(matrix, query):
+        n, d = matrix.shape
+        query_norm = 0.0
+        for j in range(d):
+            query_norm += query[j] * query[j]
+        query_norm = np.sqrt(query_norm)
+
+        scores = np.empty(n, dtype=np.float32)
+        for i in numba.prange(n):
+            dot = 0.0
+            norm = 0.0
+            for j in range(d):
+                dot += matrix[i, j] * query[j]
+                norm += matrix[i, j] * matrix[i, j]
+            denominator = np.sqrt(norm) * query_norm
+            scores[i] = dot / denominator if denominator > 0 else 0.0
+        return scores
+else:
+    _cosine_scores_jit = None
+
+def top_k_indices(scores, k: int) -> np.ndarray:
+    """
+    Indices of the k largest scores, best first.
+
+    Uses argpartition (O(N)) and only sorts the k selected entries. Partitioning at
+    N - k selects the largest entries without materializing a negated copy of scores.
+    """
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        top = np.argpartition(scores, -k)[-k:]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+def cosine_scores(matrix, query) -> np.ndarray:
+    """
+    Cosine similarity between each row of matrix (N x d) and query (d,).
+
+    Uses SimSIMD's cosine kernels when simsimd is installed, then a parallel numba
+    kernel when numba is, otherwise plain NumPy.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    query = np.ascontiguousarray(query, dtype=np.float32).reshape(-1)
+    if simsimd is not None:
+        # cdist returns cosine distances; zero vectors come back as distance 1, i.e. score 0
+        return 1.0 - np.asarray(simsimd.cdist(query.reshape(1, -1), matrix, metric="cosine"), dtype=np.float32)[0]
+    if _cosine_scores_jit is not None:
+        return _cosine_scores_jit(matrix, query)
+
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return (matrix @ query) / np.maximum(norms, 1e-12)
@@ -1,9 +1,10 @@
 from mem4ai.strategies.embedding_strategy import LiteLLMEmbeddingStrategy
 from mem4ai.strategies.storage_strategy import LMDBStorageStrategy
 from mem4ai.strategies.search_strategy import DefaultSearchStrategy
-from mem4ai.core.embedding_manager import EmbeddingManager
+from mem4ai.core.embedding_manager import EmbeddingManager, l2_normalize
 from mem4ai.core.memory import Memory
 from mem4ai.memtor import Memtor
+import numpy as np
 import pytest
 from mem4ai import Memtor, Memory
 
@@ -14,8 +15,8 @@ def test_embedding():
     # Test single string embedding
     test_string = "This is a test sentence for embedding."
     embedding = embedding_strategy.embed(test_string)
-    print(f"Single string embedding shape: {len(embedding)}")
-    assert len(embedding[0]) == embedding_strategy.dimension, "Embedding dimension mismatch"
+    print(f"Single string embedding shape: {embedding.shape}")
+    assert embedding.shape[-1] == embedding_strategy.dimension, "Embedding dimension mismatch"
 
     # Test list of strings embedding
     test_strings = [
@@ -24,12 +25,12 @@ def test_embedding():
         "I think, therefore I am."
     ]
     embeddings = embedding_strategy.embed(test_strings)
-    print(f"List of strings embedding shape: {len(embeddings)}x{len(embeddings[0])}")
-    assert all(len(emb) == embedding_strategy.dimension for emb in embeddings), "Embedding dimension mismatch"
+    print(f"List of strings embedding shape: {embeddings.shape}")
+    assert embeddings.shape == (len(test_strings), embedding_strategy.dimension), "Embedding dimension mismatch"
 
     # Test embedding similarity
-    from sklearn.metrics.pairwise import cosine_similarity
-    similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
+    from mem4ai.utils.vector_ops import cosine_scores
+    similarity = cosine_scores(embeddings[:1], embeddings[1])[0]
     print(f"Cosine similarity between first two sentences: {similarity}")
 
     print("All tests passed successfully!")
@@ -39,11 +40,12 @@ def test_storage():
     storage = LMDBStorageStrategy()
     
     # Test save and load
-    test_memory = Memory("Test content", {"tag": "test"})
+    test_memory = Memory("Test content", {"tag": "test"}, embedding=[0.1, 0.2, 0.3])
     storage.save(test_memory)
     loaded_memory = storage.load(test_memory.id)
     assert loaded_memory is not None, "Failed to load saved memory"
     assert loaded_memory.content == test_memory.content, "Loaded memory content does not match"
+    assert isinstance(loaded_memory.embedding, np.ndarray) and loaded_memory.embedding.dtype == np.float32, "Embedding not stored as float32"
     
     # Test update
     test_memory.content = "Updated content"
@@ -59,8 +61,7 @@ def test_storage():
     # Test list_all and apply_filters
     memory1 = Memory("Content 1", {"value": 10})
     memory2 = Memory("Content 2", {"value": 20})
-    storage.save(memory1)
-    storage.save(memory2)
+    storage.save_many([memory1, memory2])
     all_memories = storage.list_all()
     assert len(all_memories) == 2, "list_all did not return all memories"
     filtered_memories = storage.apply_filters(all_memories, [("value", ">", 15)])
@@ -84,9 +85,11 @@ def test_search_strategy():
         Memory("I think, therefore I am", {"tag": "philosophy", "year": 2018})
     ]
 
-    # Assign embeddings to test memories using EmbeddingManager
-    for memory in test_memories:
-        memory.embedding = embedding_manager.embed(memory.content)
+    # Assign embeddings to test memories using EmbeddingManager, in a single batch request
+    # Normalized float32 rows, as Memtor stores them, so search scores them with a single float32 product
+    embeddings = l2_normalize(embedding_manager.embed_batch([memory.content for memory in test_memories]))
+    for memory, embedding in zip(test_memories, embeddings):
+        memory.embedding = embedding.reshape(1, -1)
 
     # Test search with string query and metadata filter
     query = "What animal jumps?"
@@ -97,7 +100,7 @@ def test_search_strategy():
     assert all(m.metadata["year"] >= 2020 for m in results), "Metadata filter not applied correctly"
 
     # Test search with embedding query and metadata filter
-    query_embedding = embedding_manager.embed("A philosophical question")
+    query_embedding = embedding_manager.embed_query("A philosophical question")
     metadata_filters = [("tag", "==", "philosophy")]
     results = search_strategy.search(query_embedding, test_memories, top_k=1, keywords=[], metadata_filters=metadata_filters)
     assert len(results) == 1, f"Expected 1 result, got {len(results)}"
@@ -134,8 +137,8 @@ def test_memtor():
     print("Three memories added successfully.")
 
     # List memories
-    all_memories = memtor.list_memories()
-    assert len(all_memories) == 3, f"Expected 3 memories, got {len(all_memories)}"
+    memory_count = memtor.count_memories()
+    assert memory_count == 3, f"Expected 3 memories, got {memory_count}"
     print("List memories successful.")
 
     # Search memories
@@ -156,8 +159,8 @@ def test_memtor():
     # Delete memory
     deleted = memtor.delete_memory(memory3_id)
     assert deleted, "Memory deletion failed"
-    remaining_memories = memtor.list_memories()
-    assert len(remaining_memories) == 2, f"Expected 2 memories after deletion, got {len(remaining_memories)}"
+    remaining_count = memtor.count_memories()
+    assert remaining_count == 2, f"Expected 2 memories after deletion, got {remaining_count}"
     print("Delete memory successful.")
 
     # Test metadata filtering
@@ -202,7 +205,7 @@ def test_knowledge_extraction():
     assert memory is not None, "Failed to retrieve memory"
     
     # Verify context structure
-    assert 'context' in memory.__dict__, "Memory doesn't have context field"
+    assert hasattr(memory, 'context'), "Memory doesn't have context field"
     context = memory.context
     
     # Basic structure checks
@@ -287,7 +290,7 @@ def test_summary_knowledge_extraction():
     assert memory is not None, "Failed to retrieve memory"
     
     # Verify context structure
-    assert 'context' in memory.__dict__, "Memory doesn't have context field"
+    assert hasattr(memory, 'context'), "Memory doesn't have context field"
     context = memory.context
     
     # Basic structure checks
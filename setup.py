@@ -49,9 +49,28 @@ setup(
         'dev': [
             'pytest>=6.0',
             'pytest-cov>=2.0',
+            'pytest-xdist>=3.0',
             'flake8>=3.9',
             'black>=21.5b1',
         ],
+        'faiss': [
+            'faiss-cpu>=1.7.4',
+        ],
+        'hnsw': [
+            'hnswlib>=0.7',
+        ],
+        'numba': [
+            'numba>=0.58',
+        ],
+        'simd': [
+            'simsimd>=5.0',
+        ],
+        'msgspec': [
+            'msgspec>=0.18',
+        ],
+        'zstd': [
+            'zstandard>=0.21',
+        ],
         'docs': [
             'sphinx>=4.0',
             'sphinx_rtd_theme>=0.5',
@@ -0,0 +1,56 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import copy
+import hashlib
+import re
+import numpy as np
+import pytest
+from mem4ai import Memtor, EmbeddingStrategy, EchoKnowledgeStrategy
+from mem4ai.utils.config_manager import config_manager
+
+
+class HashEmbedding(EmbeddingStrategy):
+    """Bag-of-words embedding hashed into 64 dimensions, so tests run without an embedding API"""
+
+    def __init__(self):
+        self.calls = 0  # Texts embedded so far
+
+    def embed(self, input):
+        texts = [input] if isinstance(input, str) else input
+        self.calls += len(texts)
+        out = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                out[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        return out
+
+    @property
+    def dimension(self) -> int:
+        return 64
+
+
+@pytest.fixture
+def config():
+    """Set dotted config keys for one test; the previous config is restored afterwards"""
+    snapshot = copy.deepcopy(config_manager.config)
+    yield config_manager.set
+    for section, value in snapshot.items():
+        config_manager.set(section, value)
+
+
+@pytest.fixture
+def hash_embedding():
+    return HashEmbedding()
+
+
+@pytest.fixture
+def offline_memtor(tmp_path, config):
+    """Build Memtor instances on a fresh store with a local embedding and no LLM extraction"""
+    config('storage.path', str(tmp_path / "memtor_storage"))
+
+    def make(**kwargs) -> Memtor:
+        kwargs.setdefault('embedding_strategy', HashEmbedding())
+        kwargs.setdefault('extraction_strategy', EchoKnowledgeStrategy())
+        return Memtor(**kwargs)
+
+    return make
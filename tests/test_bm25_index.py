@@ -0,0 +1,82 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+import pytest
+from mem4ai import Memory
+from mem4ai.core.bm25_index import BM25Index
+from mem4ai.strategies.search_strategy import DefaultSearchStrategy
+
+CORPUS = [
+    "The quick brown fox jumps over the lazy dog",
+    "A fox and another fox met a fox in the forest",
+    "Stock markets fell sharply on Monday",
+    "Dogs are loyal companions and dogs love walks",
+    "The brown bear fishes for salmon in the river",
+]
+
+
+@pytest.fixture
+def memories():
+    return [Memory(content) for content in CORPUS]
+
+
+@pytest.fixture
+def index(memories):
+    index = BM25Index()
+    index.add_many((memory.id, memory.content) for memory in memories)
+    return index
+
+
+def test_add_tracks_lengths_and_postings(index, memories):
+    assert len(index) == len(CORPUS)
+    assert index._total_len == sum(index.doc_lens.values())
+    assert index.postings["fox"] == {memories[0].id: 1, memories[1].id: 3}
+    # Stop words are not indexed
+    assert "the" not in index.postings
+
+
+def test_re_add_replaces_previous_content(index, memories):
+    total = index._total_len
+    old_len = index.doc_lens[memories[2].id]
+    index.add(memories[2].id, "Salmon salmon salmon")
+
+    assert len(index) == len(CORPUS)
+    assert index._total_len == total - old_len + 3
+    assert index.postings["salmon"][memories[2].id] == 3
+    # Terms only the old content had leave no empty postings behind
+    for term in ("stock", "markets", "sharply", "monday"):
+        assert term not in index.postings
+
+
+def test_remove_drops_postings_and_length(index, memories):
+    assert index.remove(memories[1].id)
+    assert not index.remove(memories[1].id)
+    assert index.postings["fox"] == {memories[0].id: 1}
+    assert "forest" not in index.postings
+    assert index._total_len == sum(index.doc_lens.values())
+
+    assert index.remove_many([memory.id for memory in memories] + ["missing"]) == len(CORPUS) - 1
+    assert len(index) == 0 and index._total_len == 0 and index.postings == {}
+
+
+def test_score_unknown_ids_and_terms(index, memories):
+    scores = index.score("fox", ["missing", memories[1].id, "also-missing"])
+    assert scores[0] == 0 and scores[2] == 0 and scores[1] > 0
+    assert not index.score("zebra", [memory.id for memory in memories]).any()
+    assert not BM25Index().score("fox", ["missing"]).any()
+
+
+def test_keywords_count_as_query_terms(index, memories):
+    ids = [memory.id for memory in memories]
+    assert index.score("fox", ids, keywords=["salmon"])[4] > 0
+
+
+@pytest.mark.parametrize("query", ["fox", "dogs walks", "salmon river bear", "markets", "brown fox"])
+def test_agrees_with_per_query_tfidf_scores(index, memories, query):
+    indexed = index.score(query, [memory.id for memory in memories])
+    per_query = np.asarray(DefaultSearchStrategy(None)._calculate_bm25_scores(query, memories, []))
+
+    # Both score the same memories, and single-topic queries pick the same best match
+    assert np.array_equal(indexed > 0, per_query > 0)
+    if query != "brown fox":
+        assert np.argmax(indexed) == np.argmax(per_query)
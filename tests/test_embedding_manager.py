@@ -0,0 +1,130 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import numpy as np
+import pytest
+from mem4ai.core.embedding_manager import EmbeddingManager
+
+
+@pytest.fixture
+def manager(hash_embedding, config):
+    config('embedding.cache_size', 4)
+    config('embedding.query_cache_size', 2)
+    return EmbeddingManager(hash_embedding)
+
+
+def test_repeated_text_is_served_from_cache(manager, hash_embedding):
+    first = manager.embed("the cat sat on the mat")
+    second = manager.embed("the cat sat on the mat")
+    assert second is first and hash_embedding.calls == 1
+    assert manager.cache_stats() == {'hits': 1, 'misses': 1, 'size': 1}
+    # Cached arrays are shared, so they are read-only
+    assert not first.flags.writeable
+
+
+def test_cache_keeps_its_own_copy(manager, hash_embedding, monkeypatch):
+    returned = []
+    embed = hash_embedding.embed
+    monkeypatch.setattr(hash_embedding, 'embed', lambda text: returned.append(embed(text)) or returned[-1])
+    cached = manager.embed("copy me")
+    assert returned[0].flags.writeable and cached is not returned[0]
+    assert np.array_equal(cached, returned[0])
+
+
+def test_least_recently_used_text_is_evicted(manager, hash_embedding):
+    for i in range(4):
+        manager.embed(f"text {i}")
+    manager.embed("text 0")  # Now the most recently used
+    manager.embed("text 4")  # Evicts text 1
+    assert manager.cache_stats()['size'] == 4
+
+    calls = hash_embedding.calls
+    manager.embed("text 0")
+    assert hash_embedding.calls == calls
+    manager.embed("text 1")
+    assert hash_embedding.calls == calls + 1
+
+
+def test_embed_batch_only_embeds_misses(manager, hash_embedding):
+    manager.embed("alpha beta")
+    rows = manager.embed_batch(["gamma", "alpha beta", "delta", "gamma"])
+    assert rows.shape == (4, 64)
+    assert hash_embedding.calls == 1 + 3
+    for row, text in zip(rows, ["gamma", "alpha beta", "delta", "gamma"]):
+        assert np.array_equal(row, manager.embed(text).reshape(-1))
+
+
+def test_cache_can_be_disabled(hash_embedding, config):
+    config('embedding.cache_size', 0)
+    manager = EmbeddingManager(hash_embedding)
+    manager.embed("no cache")
+    manager.embed("no cache")
+    assert hash_embedding.calls == 2
+
+
+def test_persistent_cache_is_shared_across_managers(hash_embedding, config, tmp_path):
+    config('embedding.cache_path', str(tmp_path / "embeddings.sqlite"))
+    first = EmbeddingManager(hash_embedding).embed("persist me")
+
+    second = EmbeddingManager(hash_embedding)
+    assert np.array_equal(second.embed("persist me"), first)
+    assert np.array_equal(second.embed_batch(["persist me"]), first.reshape(1, -1))
+    assert hash_embedding.calls == 1
+
+    second.clear_cache()
+    EmbeddingManager(hash_embedding).embed("persist me")
+    assert hash_embedding.calls == 2
+
+
+def test_fuzzy_cache_reuses_near_duplicates(hash_embedding, config):
+    config('embedding.fuzzy_cache', True)
+    manager = EmbeddingManager(hash_embedding)
+    original = manager.embed("Please remind me to call my mother tomorrow morning at nine")
+    assert manager.embed("Please remind me to call my mother tomorrow morning at nine.") is original
+    assert hash_embedding.calls == 1
+
+    # Exact callers opt out, and unrelated texts never match
+    manager.embed("Please remind me to call my mother tomorrow morning at nine.", fuzzy=False)
+    manager.embed("Stock markets fell sharply on Monday")
+    assert hash_embedding.calls == 3
+
+
+def test_query_cache_survives_bulk_embedding(manager, hash_embedding):
+    query = manager.embed_query("where is my umbrella")
+    # Filling the shared LRU does not evict the query from its own cache
+    manager.embed_batch([f"content {i}" for i in range(10)])
+    calls = hash_embedding.calls
+    assert manager.embed_query("where is my umbrella") is query
+    assert hash_embedding.calls == calls and not query.flags.writeable
+
+    manager.embed_query("second query")
+    manager.embed_query("third query")  # Evicts the first query
+    assert len(manager._query_cache) == 2 and "where is my umbrella" not in manager._query_cache
+
+
+def test_concurrent_use_keeps_caches_consistent(hash_embedding, config):
+    config('embedding.cache_size', 8)
+    config('embedding.query_cache_size', 4)
+    config('embedding.fuzzy_cache', True)
+    manager = EmbeddingManager(hash_embedding)
+    errors = []
+
+    def work(offset):
+        try:
+            for i in range(500):
+                text = f"text {(i * 7 + offset) % 23}"
+                manager.embed(text)
+                manager.embed_query(text)
+                manager.embed_batch([text, f"other {i % 13}"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(manager._cache) <= 8 and len(manager._query_cache) <= 4
+    assert set(manager._fuzzy) == set(manager._cache)
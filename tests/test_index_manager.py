@@ -0,0 +1,117 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+import pytest
+from mem4ai.core.index_manager import NumpyIndexManager, FaissIndexManager, HNSWIndexManager
+
+
+def numpy_index(dtype):
+    return lambda: NumpyIndexManager(initial_capacity=2, dtype=dtype, tile_rows=3, filter_keys=['tag'])
+
+
+def faiss_index(dtype):
+    def build():
+        pytest.importorskip("faiss")
+        return FaissIndexManager(dtype=dtype)
+    return build
+
+
+def hnsw_index():
+    pytest.importorskip("hnswlib")
+    return HNSWIndexManager(initial_capacity=2)
+
+
+INDICES = {
+    'numpy-float32': numpy_index('float32'),
+    'numpy-float16': numpy_index('float16'),
+    'numpy-int8': numpy_index('int8'),
+    'faiss-float32': faiss_index('float32'),
+    'faiss-float16': faiss_index('float16'),
+    'faiss-int8': faiss_index('int8'),
+    'hnsw': hnsw_index,
+}
+
+
+@pytest.fixture(params=list(INDICES))
+def index(request):
+    return INDICES[request.param]()
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return {f"m{i}": rng.standard_normal(32).astype(np.float32) for i in range(20)}
+
+
+def metadata(i):
+    return {'user_id': f"u{i % 2}", 'session_id': f"s{i % 4}", 'tag': 'even' if i % 2 == 0 else 'odd'}
+
+
+def add_all(index, vectors):
+    ids = list(vectors)
+    index.add_many(ids[:10], [vectors[memory_id] for memory_id in ids[:10]],
+                   [metadata(i) for i in range(10)])
+    for i, memory_id in enumerate(ids[10:], start=10):
+        index.add(memory_id, vectors[memory_id], metadata(i))
+
+
+def test_search_finds_each_vector_first(index, vectors):
+    add_all(index, vectors)
+    assert len(index) == len(vectors)
+    for memory_id, vector in vectors.items():
+        hits = index.search(vector, 3)
+        assert hits[0][0] == memory_id
+        assert hits[0][1] == pytest.approx(1.0, abs=0.02)
+        assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+
+def test_re_add_replaces_vector(index, vectors):
+    add_all(index, vectors)
+    index.add("m0", vectors["m5"], metadata(0))
+    assert len(index) == len(vectors)
+    assert {memory_id for memory_id, _ in index.search(vectors["m5"], 2)} == {"m0", "m5"}
+    assert index.search(vectors["m0"], 1)[0][0] != "m0"
+
+
+def test_remove_round_trip(index, vectors):
+    add_all(index, vectors)
+    assert index.remove("m3")
+    assert not index.remove("m3")
+    assert index.remove_many(["m4", "m5", "missing"]) == 2
+    assert len(index) == len(vectors) - 3
+
+    hits = index.search(vectors["m3"], len(vectors))
+    assert {memory_id for memory_id, _ in hits} == set(vectors) - {"m3", "m4", "m5"}
+
+    # Removed memories can come back
+    index.add("m3", vectors["m3"], metadata(3))
+    assert index.search(vectors["m3"], 1)[0][0] == "m3"
+
+    index.clear()
+    assert len(index) == 0 and index.search(vectors["m3"], 5) == []
+
+
+def test_k_larger_than_index(index, vectors):
+    index.add("m0", vectors["m0"], metadata(0))
+    assert [memory_id for memory_id, _ in index.search(vectors["m1"], 10)] == ["m0"]
+
+
+def test_filters_round_trip(index, vectors):
+    add_all(index, vectors)
+    hits = index.search(vectors["m1"], len(vectors), {'user_id': 'u1'}, [('tag', '==', 'odd')])
+    matching = {f"m{i}" for i in range(20) if metadata(i)['user_id'] == 'u1'}
+    if index.filters_metadata:
+        assert {memory_id for memory_id, _ in hits} == matching
+        assert index.filter_ids({'user_id': 'u1', 'session_id': 's1'}) is not None
+        assert set(index.filter_ids({'user_id': 'u1', 'session_id': 's1'})) == \
+            {f"m{i}" for i in range(20) if i % 4 == 1}
+        assert set(index.filter_ids({}, [('tag', '!=', 'odd')])) == set(vectors) - matching
+
+        # Filters follow re-added and removed memories
+        index.add("m1", vectors["m1"], {'user_id': 'u0', 'tag': 'even'})
+        index.remove("m3")
+        assert set(index.filter_ids({'user_id': 'u1'})) == matching - {"m1", "m3"}
+    else:
+        # Indices without metadata ignore the filters and leave them to the caller
+        assert matching <= {memory_id for memory_id, _ in hits}
+        assert index.filter_ids({'user_id': 'u1'}) is None
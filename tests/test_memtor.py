@@ -2,15 +2,23 @@ import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import pytest
 from mem4ai import Memtor, Memory
+from mem4ai.utils.config_manager import config_manager
 from typing import List, Dict, Any
 
-@pytest.fixture
-def memtor():
+@pytest.fixture(scope="session")
+def memtor(tmp_path_factory):
+    # One instance for the whole run, so the embedding client and LMDB environments are set up once.
+    # The store lives under pytest's temp dir rather than the working directory; under
+    # pytest-xdist (`pytest -n auto`) each worker gets its own store, so parallel tests do
+    # not clear each other's test_user and test_session memories
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    path = tmp_path_factory.mktemp(f"memtor_storage_{worker}" if worker else "memtor_storage")
+    config_manager.set('storage.path', str(path))
     return Memtor()
 
 @pytest.fixture
-def clean_memtor():
-    m = Memtor()
+def clean_memtor(memtor: Memtor):
+    m = memtor
     # Clear memories for test users and sessions
     m.delete_memories_by_user("test_user")
     m.delete_memories_by_session("test_session")
@@ -53,8 +61,11 @@ def test_delete_memory(clean_memtor: Memtor):
     assert clean_memtor.get_memory(memory_id) is None
 
 def test_list_memories(clean_memtor: Memtor, sample_memories: List[Dict[str, Any]]):
-    for mem in sample_memories:
-        clean_memtor.add_memory(mem["content"], mem["metadata"], user_id="test_user", session_id="test_session")
+    clean_memtor.add_memories([
+        {"user_message": mem["content"], "assistant_response": "Noted.", "metadata": mem["metadata"],
+         "user_id": "test_user", "session_id": "test_session"}
+        for mem in sample_memories
+    ])
     
     all_memories = clean_memtor.list_memories(user_id="test_user")
     assert len(all_memories) == len(sample_memories)
@@ -68,8 +79,11 @@ def test_list_memories(clean_memtor: Memtor, sample_memories: List[Dict[str, Any
     assert all(mem.metadata["year"] >= 2021 for mem in recent_memories)
 
 def test_search_memories(clean_memtor: Memtor, sample_memories: List[Dict[str, Any]]):
-    for mem in sample_memories:
-        clean_memtor.add_memory(mem["content"], mem["metadata"], user_id="test_user", session_id="test_session")
+    clean_memtor.add_memories([
+        {"user_message": mem["content"], "assistant_response": "Noted.", "metadata": mem["metadata"],
+         "user_id": "test_user", "session_id": "test_session"}
+        for mem in sample_memories
+    ])
 
     results = clean_memtor.search_memories("fox", top_k=1, user_id="test_user")
     assert len(results) == 1
@@ -84,35 +98,33 @@ def test_search_memories(clean_memtor: Memtor, sample_memories: List[Dict[str, A
     assert "work" in results[0].content.lower()
     assert results[0].metadata["year"] > 2020
 
-def test_error_handling(clean_memtor: Memtor):
-    with pytest.raises(TypeError):
-        clean_memtor.add_memory(123)  # type: ignore
-
-    with pytest.raises(TypeError):
-        clean_memtor.get_memory(123)  # type: ignore
-
-    with pytest.raises(TypeError):
-        clean_memtor.update_memory(123, "content")  # type: ignore
-
+@pytest.mark.parametrize("method,args", [
+    ("add_memory", (123,)),
+    ("get_memory", (123,)),
+    ("update_memory", (123, "content")),
+    ("delete_memory", (123,)),
+    ("search_memories", (123,)),
+])
+def test_error_handling(clean_memtor: Memtor, method: str, args: tuple):
     with pytest.raises(TypeError):
-        clean_memtor.delete_memory(123)  # type: ignore
-
-    with pytest.raises(TypeError):
-        clean_memtor.search_memories(123)  # type: ignore
+        getattr(clean_memtor, method)(*args)
 
 def test_memory_persistence(clean_memtor: Memtor):
     memory_id = clean_memtor.add_memory("Persistent content", {"tag": "persist"}, user_id="test_user")
     
-    # Create a new Memtor instance to check if the memory persists
-    new_memtor = Memtor()
+    # Create a new Memtor instance to check if the memory persists; reading by ID needs no vector index
+    new_memtor = Memtor(load_index=False)
     retrieved_memory = new_memtor.get_memory(memory_id)
     assert retrieved_memory is not None
     assert retrieved_memory.content == "Persistent content"
     assert retrieved_memory.metadata["tag"] == "persist"
 
 def test_delete_memories_by_user(clean_memtor: Memtor):
-    for i in range(5):
-        clean_memtor.add_memory(f"Test content {i}", {"tag": "test"}, user_id="test_user")
+    clean_memtor.add_memories([
+        {"user_message": f"Test content {i}", "assistant_response": "Noted.", "metadata": {"tag": "test"},
+         "user_id": "test_user"}
+        for i in range(5)
+    ])
     
     deleted_count = clean_memtor.delete_memories_by_user("test_user")
     assert deleted_count == 5
@@ -121,8 +133,11 @@ def test_delete_memories_by_user(clean_memtor: Memtor):
     assert len(remaining_memories) == 0
 
 def test_delete_memories_by_session(clean_memtor: Memtor):
-    for i in range(3):
-        clean_memtor.add_memory(f"Test content {i}", {"tag": "test"}, session_id="test_session")
+    clean_memtor.add_memories([
+        {"user_message": f"Test content {i}", "assistant_response": "Noted.", "metadata": {"tag": "test"},
+         "session_id": "test_session"}
+        for i in range(3)
+    ])
     
     deleted_count = clean_memtor.delete_memories_by_session("test_session")
     assert deleted_count == 3
@@ -130,5 +145,98 @@ def test_delete_memories_by_session(clean_memtor: Memtor):
     remaining_memories = clean_memtor.list_memories(session_id="test_session")
     assert len(remaining_memories) == 0
 
+
+def test_extract_knowledge_batch_runs_concurrently():
+    import threading
+    from mem4ai.strategies.knowledge_extraction import EchoKnowledgeStrategy
+
+    lock = threading.Lock()
+    # Every call waits here until all 8 are inside extract_knowledge; a sequential loop
+    # would break the barrier on its timeout instead
+    barrier = threading.Barrier(8, timeout=10)
+    in_flight = {"now": 0, "peak": 0}
+
+    class SlowEcho(EchoKnowledgeStrategy):
+        def extract_knowledge(self, user_message, assistant_response):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            try:
+                barrier.wait()
+            finally:
+                with lock:
+                    in_flight["now"] -= 1
+            return {"user_message": user_message}
+
+    pairs = [(f"message {i}", "response") for i in range(8)]
+    contexts = SlowEcho().extract_knowledge_batch(pairs, max_workers=8)
+
+    assert [context["user_message"] for context in contexts] == [user for user, _ in pairs]
+    assert in_flight["peak"] > 1
+
+
+def test_near_duplicate_reuses_context_without_extracting(offline_memtor, config):
+    import asyncio
+    from mem4ai.strategies.knowledge_extraction import EchoKnowledgeStrategy
+
+    class CountingEcho(EchoKnowledgeStrategy):
+        calls = 0
+
+        def extract_knowledge(self, user_message, assistant_response):
+            CountingEcho.calls += 1
+            return {"user_message": user_message}
+
+    config('extraction.cancel_similarity', 0.99)
+    memtor = offline_memtor(extraction_strategy=CountingEcho())
+    memtor.add_memory("Remind me to water the plants", "Sure", user_id="test_user")
+    duplicate = memtor.add_memory("Remind me to water the plants", "Sure", user_id="test_user")
+    duplicate_async = asyncio.run(memtor.add_memory_async("Remind me to water the plants", "Sure",
+                                                          user_id="test_user"))
+
+    # The duplicates take the stored context and never reach the extraction strategy
+    assert CountingEcho.calls == 1
+    for memory_id in (duplicate, duplicate_async):
+        assert memtor.get_memory(memory_id).context == {"user_message": "Remind me to water the plants"}
+
+    # Other users' memories are not reused, and unrelated content is extracted
+    memtor.add_memory("Remind me to water the plants", "Sure", user_id="other_user")
+    memtor.add_memory("Book a table for two", "Done", user_id="test_user")
+    assert CountingEcho.calls == 3
+
+
+def test_update_memories(offline_memtor, hash_embedding, config):
+    config('search.bm25_index', True)
+    memtor = offline_memtor(embedding_strategy=hash_embedding)
+    first = memtor.add_memory("My favourite colour is blue", "Noted", {"tag": "colour"}, user_id="test_user")
+    second = memtor.add_memory("I live in Lisbon", "Noted", {"tag": "home"}, user_id="test_user")
+    unchanged = memtor.get_memory(second)
+    calls = hash_embedding.calls
+
+    results = memtor.update_memories([
+        {"memory_id": first, "content": "My favourite colour is green", "metadata": {"tag": "updated"}},
+        {"memory_id": "missing", "content": "Nothing to update"},
+        {"memory_id": second, "content": unchanged.content, "metadata": {"city": "Lisbon"}},
+    ])
+    assert results == [True, False, True]
+
+    updated = memtor.get_memory(first)
+    assert updated.content == "My favourite colour is green"
+    assert updated.metadata["tag"] == "updated" and updated.metadata["user_id"] == "test_user"
+    assert updated.update_history[-1]["content"].startswith("User: My favourite colour is blue")
+    # Only the changed content is re-embedded
+    assert hash_embedding.calls == calls + 1
+    kept = memtor.get_memory(second)
+    assert kept.metadata["city"] == "Lisbon"
+    assert (kept.embedding == unchanged.embedding).all()
+
+    # Searches see the new content, not the old
+    hits = memtor.search_memories("favourite colour green", top_k=1, user_id="test_user")
+    assert [memory.id for memory in hits] == [first]
+    assert first in memtor.bm25_index.postings["green"] and "blue" not in memtor.bm25_index.postings
+
+    with pytest.raises(TypeError):
+        memtor.update_memories([{"memory_id": first, "content": None}])
+
+
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
@@ -0,0 +1,114 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import time
+from mem4ai.utils.rwlock import RWLock
+
+TIMEOUT = 5
+
+
+def start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_readers_share_the_lock():
+    lock = RWLock()
+    # Every reader waits here for the others, which only works if they hold the lock together
+    barrier = threading.Barrier(3, timeout=TIMEOUT)
+    errors = []
+
+    def read():
+        with lock.read_lock():
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError as e:
+                errors.append(e)
+
+    threads = [start(read) for _ in range(3)]
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert not errors
+
+
+def test_writer_excludes_readers_and_writers():
+    lock = RWLock()
+    entered = []
+
+    with lock.write_lock():
+        # Each thread keeps what it acquires
+        start(lambda: lock.acquire_read() or entered.append("reader"))
+        start(lambda: lock.acquire_write() or entered.append("writer"))
+        time.sleep(0.05)
+        assert entered == []
+    # One of them gets in once the writer leaves; the other keeps waiting for it
+    wait_until(lambda: entered)
+    time.sleep(0.05)
+    assert len(entered) == 1
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = RWLock()
+    order = []
+    lock.acquire_read()
+
+    def write():
+        with lock.write_lock():
+            order.append("writer")
+
+    def read():
+        with lock.read_lock():
+            order.append("reader")
+
+    writer = start(write)
+    wait_until(lambda: lock._writers_waiting == 1)
+    reader = start(read)
+    time.sleep(0.05)
+    # The second reader queues behind the writer instead of starving it
+    assert order == []
+
+    lock.release_read()
+    writer.join(TIMEOUT)
+    reader.join(TIMEOUT)
+    assert order == ["writer", "reader"]
+
+
+def test_write_lock_is_reentrant_and_allows_reads():
+    lock = RWLock()
+    with lock.write_lock():
+        with lock.write_lock():
+            with lock.read_lock():
+                pass
+        # Still held by this thread after the nested releases
+        assert lock._writer == threading.get_ident()
+    assert lock._writer is None and lock._readers == 0
+
+    # Released completely, so another thread can write
+    other = start(lock.acquire_write)
+    other.join(TIMEOUT)
+    assert not other.is_alive()
+
+
+def test_writes_are_serialized():
+    lock = RWLock()
+    counter = {"value": 0}
+
+    def increment():
+        for _ in range(1000):
+            with lock.write_lock():
+                value = counter["value"]
+                time.sleep(0)
+                counter["value"] = value + 1
+
+    threads = [start(increment) for _ in range(4)]
+    for thread in threads:
+        thread.join(TIMEOUT * 4)
+    assert counter["value"] == 4000
@@ -0,0 +1,217 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pickle
+import random
+from datetime import datetime
+import numpy as np
+import pytest
+from mem4ai import Memory
+from mem4ai.strategies.storage_strategy import LMDBStorageStrategy
+
+WORDS = "the user asked about python memory storage vectors search index latency cache".split()
+
+
+class LegacyMemory:
+    """Pickles like a Memory saved before timestamp_ns, framed entries and the LMDB indices existed"""
+
+    def __init__(self, memory: Memory, timestamp: datetime):
+        self.state = {name: getattr(memory, name) for name in Memory.__slots__ if name != 'timestamp_ns'}
+        self.state['timestamp'] = timestamp
+
+    def __reduce__(self):
+        return Memory.__new__, (Memory,), self.state
+
+
+@pytest.fixture
+def storage(config, tmp_path):
+    config('storage.path', str(tmp_path / "storage"))
+
+    def make(**options) -> LMDBStorageStrategy:
+        for key, value in options.items():
+            config(f'storage.{key}', value)
+        return LMDBStorageStrategy()
+
+    return make
+
+
+def make_memory(i: int = 0) -> Memory:
+    rng = random.Random(i)
+    memory = Memory(" ".join(rng.choice(WORDS) for _ in range(40)), {'tag': f"t{i % 5}"},
+                    user_id=f"u{i % 3}", embedding=np.random.default_rng(i).random(16, dtype=np.float32))
+    memory.context = {'summary': f"conversation about {rng.choice(WORDS)}", 'entities': ["python", "lmdb"]}
+    return memory
+
+
+def raw_entry(storage: LMDBStorageStrategy, memory_id: str) -> bytes:
+    with storage.env.begin() as txn:
+        return bytes(txn.get(memory_id.encode()))
+
+
+def assert_same(loaded: Memory, memory: Memory):
+    for name in ('id', 'content', 'context', 'metadata', 'update_history', 'timestamp_ns'):
+        assert getattr(loaded, name) == getattr(memory, name)
+    assert loaded.embedding.dtype == np.float32 and loaded.embedding.flags.writeable
+    assert np.array_equal(loaded.embedding, memory.embedding)
+
+
+def test_pickle_round_trip(storage):
+    store = storage()
+    memory = make_memory()
+    memory.update("updated content")
+    store.save(memory)
+    assert raw_entry(store, memory.id)[:4] == LMDBStorageStrategy.MEMORY_MAGIC
+    assert_same(store.load(memory.id), memory)
+    assert_same(store.load_many(["missing", memory.id])[1], memory)
+
+
+def test_list_embeddings_are_stored_as_float32(storage):
+    store = storage()
+    memory = Memory("list embedding", embedding=[0.5, 0.25, 1.0])
+    store.save(memory)
+    loaded = store.load(memory.id)
+    assert loaded.embedding.dtype == np.float32 and loaded.embedding.tolist() == [0.5, 0.25, 1.0]
+    # The caller's memory is left as it was
+    assert memory.embedding == [0.5, 0.25, 1.0]
+
+
+def test_msgpack_round_trip(storage):
+    pytest.importorskip("msgspec")
+    store = storage(serializer='msgpack')
+    memory = make_memory()
+    memory.metadata['nested'] = [1, {'a': 2.5}]
+    memory.update("updated content")
+    store.save(memory)
+    assert raw_entry(store, memory.id)[:4] == LMDBStorageStrategy.MSGPACK_MAGIC
+    assert_same(store.load(memory.id), memory)
+
+    # A 2-D embedding keeps its shape
+    matrix = Memory("matrix", embedding=np.arange(6, dtype=np.float32).reshape(2, 3))
+    store.save(matrix)
+    assert store.load(matrix.id).embedding.shape == (2, 3)
+
+
+def test_msgpack_falls_back_to_pickle(storage):
+    pytest.importorskip("msgspec")
+    store = storage(serializer='msgpack')
+    # Sets and datetimes would come back from msgpack as lists and strings
+    memory = Memory("unsafe", {'tags': {"a", "b"}, 'when': datetime(2020, 1, 2)}, embedding=np.ones(4))
+    store.save(memory)
+    assert raw_entry(store, memory.id)[:4] == LMDBStorageStrategy.MEMORY_MAGIC
+    loaded = store.load(memory.id)
+    assert loaded.metadata['tags'] == {"a", "b"} and loaded.metadata['when'] == datetime(2020, 1, 2)
+
+
+def test_serializers_read_each_others_entries(storage):
+    pytest.importorskip("msgspec")
+    pickled = make_memory(1)
+    storage().save(pickled)
+
+    store = storage(serializer='msgpack')
+    packed = make_memory(2)
+    store.save(packed)
+    assert_same(store.load(pickled.id), pickled)
+
+    store = storage(serializer='pickle')
+    assert [memory.id for memory in store.load_many([packed.id, pickled.id])] == [packed.id, pickled.id]
+    assert_same(store.load(packed.id), packed)
+
+
+def test_compressed_round_trip(storage):
+    pytest.importorskip("zstandard")
+    store = storage(compress=True, compress_dict_samples=100)
+    memories = [make_memory(i) for i in range(300)]
+    store.save_many(memories[:50])
+    assert store._zstd_dict_id is None  # Still collecting samples
+    for memory in memories[50:]:
+        store.save(memory)
+    assert store._zstd_dict_id is not None
+
+    # Entries written before the dictionary stay uncompressed; both kinds load
+    assert raw_entry(store, memories[0].id)[:4] == LMDBStorageStrategy.MEMORY_MAGIC
+    assert raw_entry(store, memories[-1].id)[:4] == LMDBStorageStrategy.COMPRESSED_MAGIC
+    for memory in memories[::25]:
+        assert_same(store.load(memory.id), memory)
+    assert len(store.list_all()) == len(memories)
+    assert len(store.find_recent(5, user_id="u1")) == 5
+
+    # Later stores reuse the trained dictionary, and read compressed entries without compressing
+    assert storage()._zstd_dict_id == store._zstd_dict_id
+    plain = storage(compress=False)
+    assert_same(plain.load(memories[-1].id), memories[-1])
+    assert plain._encode_memory(memories[0])[:4] != LMDBStorageStrategy.COMPRESSED_MAGIC
+
+
+def test_compressed_msgpack_round_trip(storage):
+    pytest.importorskip("msgspec")
+    pytest.importorskip("zstandard")
+    store = storage(serializer='msgpack', compress=True, compress_dict_samples=100)
+    memories = [make_memory(i) for i in range(150)]
+    store.save_many(memories)
+    memory = make_memory(500)
+    store.save(memory)
+    entry = raw_entry(store, memory.id)
+    assert entry[:4] == LMDBStorageStrategy.COMPRESSED_MAGIC
+    assert store._zstd_decompressor(store._zstd_dict_id).decompress(entry[8:])[:4] == \
+        LMDBStorageStrategy.MSGPACK_MAGIC
+    assert_same(store.load(memory.id), memory)
+
+
+def test_legacy_store_is_migrated(storage):
+    old = storage()
+    memories = [Memory(f"legacy {i}", user_id="u", embedding=np.full(4, i, dtype=np.float32)) for i in range(4)]
+    # Plain pickles with a datetime timestamp, one pickled dict of timestamps, a pickled ID set
+    # per metadata value, and no embedding index
+    with old.env.begin(write=True) as txn:
+        for i, memory in enumerate(memories):
+            txn.put(memory.id.encode(), pickle.dumps(LegacyMemory(memory, datetime(2024, 1, 1 + i))))
+    with old.timestamp_env.begin(write=True) as txn:
+        txn.put(b'timestamp_index', pickle.dumps({}))
+    with old.metadata_env.begin(write=True) as txn:
+        txn.put(b'user_id', pickle.dumps({'u'}))
+        txn.put(b'user_id:u', pickle.dumps({memory.id for memory in memories}))
+
+    store = storage()
+    assert [memory.content for memory in store.find_recent(2)] == ["legacy 3", "legacy 2"]
+    assert store.load(memories[0].id).timestamp == datetime(2024, 1, 1)
+    assert store.count_filtered(user_id="u") == 4
+    assert {memory_id for memory_id, _, _ in store.iter_embeddings()} == {memory.id for memory in memories}
+    with store.timestamp_env.begin() as txn:
+        assert txn.get(b'timestamp_index') is None
+    with store.metadata_env.begin() as txn:
+        assert txn.get(b'user_id') is None and txn.get(b'user_id:u') is None
+
+    # Legacy entries are rewritten in the current format on their next save
+    memory = store.load(memories[1].id)
+    memory.update("rewritten")
+    store.save(memory)
+    assert raw_entry(store, memory.id)[:4] == LMDBStorageStrategy.MEMORY_MAGIC
+    assert store.load(memory.id).timestamp_ns == memory.timestamp_ns
+
+
+def test_reopening_with_different_options_warns(storage, capsys):
+    first = storage()
+    capsys.readouterr()
+    second = storage()
+    assert second.env is first.env and capsys.readouterr().out == ""
+
+    third = storage(map_size=first.map_size * 2, writemap=True)
+    # The environment keeps the options it was first opened with
+    assert third.env is first.env and third.env.info()['map_size'] == first.map_size
+    out = capsys.readouterr().out
+    assert "Warning" in out and "map_size" in out and "writemap=True" in out
+
+
+def test_decoded_cache_is_invalidated_by_other_strategies(storage):
+    cached = storage(cache_size=16)
+    memory = make_memory()
+    cached.save(memory)
+    assert cached.load(memory.id).content == memory.content
+    assert memory.id.encode() in cached._cache.entries
+
+    # A second strategy on the same store, even one without a cache of its own, invalidates it
+    writer = storage(cache_size=0)
+    memory.update("written elsewhere")
+    writer.save(memory)
+    assert cached.load(memory.id).content == "written elsewhere"
+    writer.delete(memory.id)
+    assert cached.load(memory.id) is None